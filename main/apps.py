@@ -12,6 +12,7 @@ class MainConfig(AppConfig):
         from django.contrib.contenttypes.models import ContentType
         from users.models import User
         from django.db.utils import OperationalError, ProgrammingError
+        import main.signals  # Registers Document cache invalidation receivers
         
         try:
             # Create Admin group if it doesn't exist
@@ -35,3 +36,11 @@ class MainConfig(AppConfig):
         except (OperationalError, ProgrammingError):
             # Database tables don't exist yet (during initial migrations)
             pass
+
+        # Optionally pre-load embedding/reranker models instead of loading them on first use
+        from main.utilities.variables import warm_up_models_on_startup
+        if warm_up_models_on_startup:
+            from main.utilities.RAG import warm_up_models
+            print("[Startup] Warming up models...")
+            warm_up_models()
+            print("[Startup] Models loaded")
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import json
 import threading
 import os
@@ -11,17 +12,30 @@ import chromadb
 from transformers import TextIteratorStreamer
 import torch
 # from main.views import model, tokenizer
-from main.models import Thread, ChatMessage, Document
-from main.utilities.RAG import embedding_model_st, rerank_minilm, rerank_alibaba
+from main.models import Thread, ChatMessage
+from main.utilities.RAG import rerank_minilm, rerank_alibaba
+from main.utilities.embedding_service import embedding_service
+from main.utilities.llm_client import post_chat_completion, stream_chat_completion
+from main.utilities.keywords import keyword_cache, local_keywords
+from main.utilities.retrieval import retrieve_chunks
+from main.utilities.document_names import get_document_names
 from main.utilities.translation import translate_en_fa
 from main.utilities.variables import *
 from main.utilities.encryption import *
 from main.utilities.helper_functions import remove_non_printable
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import aiohttp
 from openai import OpenAI
-import requests
+
+
+def _stop_prefix_len(text, stop_sequence):
+    """Length of the longest suffix of text that is a proper prefix of stop_sequence (0 without a stop sequence)."""
+    if not stop_sequence:
+        return 0
+    for length in range(min(len(stop_sequence) - 1, len(text)), 0, -1):
+        if text.endswith(stop_sequence[:length]):
+            return length
+    return 0
 
 
 class RAGConsumer(AsyncConsumer):
@@ -49,39 +63,86 @@ class RAGConsumer(AsyncConsumer):
             return
         dict_data = json.loads(client_data)
         mode = dict_data.get("mode")
-        if mode == "translation":
+        if mode == "handshake":
+            # The only private-key RSA operation of the connection
+            self.aes_key = decrypt_aes_key(dict_data.get("encrypted_aes_key"))
+        elif mode == "translation":
             await self._handle_translation(dict_data)
         elif mode == "context":
             await self._handle_context(dict_data)
+        elif mode == "stop":
+            await self._stop_generation()
         else:
+            # Chat runs as a task, so "stop" and disconnect events are dispatched while the answer streams
+            await self._stop_generation()
+            self.generation_task = asyncio.ensure_future(self._run_chat(dict_data))
+
+    def _message_aes_key(self, dict_data):
+        """AES key for a message: the handshake session key, or a per-message key sent by older clients."""
+        encrypted_aes_key = dict_data.get("encrypted_aes_key")
+        if encrypted_aes_key:
+            return decrypt_aes_key(encrypted_aes_key)
+        aes_key = getattr(self, "aes_key", None)
+        if aes_key is None:
+            raise ValueError("No AES session key - the client must send a handshake first")
+        return aes_key
+
+    async def _stop_generation(self):
+        """Cancel the in-flight chat task; the LLM stream is aborted and the partial answer is saved."""
+        task = getattr(self, "generation_task", None)
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print("Error while stopping generation:", e)
+
+    async def _send_last(self, message_id=None):
+        """Closing frame of a chat turn; message_id is None when no answer was saved (stopped early or failed)."""
+        if getattr(self, "disconnected", False):
+            return
+        await self.send({
+            "type": "websocket.send",
+            "text": json.dumps({"message_id": message_id, "mode": "last"})
+        })
+
+    async def _run_chat(self, dict_data):
+        """Run one chat turn; whatever happens, the client gets a "last" frame and leaves the "working" state."""
+        try:
             await self._handle_chat(dict_data)
+        except asyncio.CancelledError:
+            # Stopped before the answer started streaming (history, retrieval, rerank)
+            print("Chat turn cancelled before streaming")
+            await self._send_last()
+            raise
+        except Exception as e:
+            print("Chat turn failed:", e)
+            try:
+                await self._send_last()
+            except Exception as send_error:
+                print("Could not send the closing frame:", send_error)
 
     async def _handle_chat(self, dict_data):
         global max_new_tokens
         username = self.user.username
         encrypted_message = dict_data.get("encrypted_message")
-        encrypted_aes_key = dict_data.get("encrypted_aes_key")
         chat_mode = dict_data.get("chat_mode")  # "standard", "rag", or "database"
         similarity_cutoff = float(dict_data.get("similarity_cutoff", 0.0))  # convert to float
         rerank_enabled = dict_data.get("rerank")
         temperature = float(dict_data.get("temperature", 0.7))  # convert to float
 
-        try:
-            await self.get_history(history_size=history_size)
-        except Exception as e:
-            print(f"Problem loading chat history: {e}")
-            return
-        
         # ---- Input validation ----
         temperature = temperature if (0.1 <= temperature <= 1.2) else 0.5
 
         # ---- Decrypt ----
-        aes_key = decrypt_aes_key(encrypted_aes_key)
+        aes_key = self._message_aes_key(dict_data)
         query = decrypt_AES_ECB(encrypted_message, aes_key)
         query = remove_non_printable(query)
         print(f"\n\nquery: {query}\n\n")
-
-        await self.create_chat_message(query, rag_response=False, source_nodes=None)
+        user_message = query
 
         # ---- Exceptional cases handling ----
         # Greetings:
@@ -92,6 +153,23 @@ class RAGConsumer(AsyncConsumer):
             max_new_tokens = 25
             chat_mode = "standard"
 
+        # ---- Concurrent pre-LLM stages ----
+        # History loading + storing the user message run alongside keyword extraction, embedding and retrieval
+        retrieval_task = None
+        if chat_mode == "rag":
+            retrieval_task = asyncio.ensure_future(self._retrieve_rag_chunks(query, similarity_cutoff))
+        try:
+            await self._load_history_and_store_query(user_message)
+        except asyncio.CancelledError:
+            if retrieval_task is not None:
+                retrieval_task.cancel()
+            raise
+        except Exception as e:
+            print(f"Problem loading chat history: {e}")
+            if retrieval_task is not None:
+                retrieval_task.cancel()
+            raise
+
         # ---- Conversation history ----
         history_text = "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in self.history])
         print(f"\n\nhistory_text: {history_text}\n\n")
@@ -100,45 +178,27 @@ class RAGConsumer(AsyncConsumer):
         # ---- RAG retrieval ----
         source_nodes_dict = {}
         if chat_mode == "rag":
-            extracted_query = self.keyword_extractor(query, llm_url, keyword_extractor_prompt)
-            print(f"\n\nextracted_query: {extracted_query}\n\n")
-
-            query_emb = embedding_model_st.encode(extracted_query).reshape(1, -1)
-            results = self.collection.get(include=["documents", "embeddings"])
-            chunk_texts = results.get("documents", [])
-            chunk_embs = np.array(results.get("embeddings", []))
+            retrieved = await retrieval_task
 
             top_chunks = []
             top_chunks_with_scores = []
 
-            # ✅ Only compute similarities if there are embeddings
-            if len(chunk_embs) > 0:
-                similarities = cosine_similarity(query_emb, chunk_embs)[0]
-
-                # Apply similarity cutoff BEFORE sorting
-                filtered_indices = [i for i, sim in enumerate(similarities) if sim >= similarity_cutoff]
-                print(f"\nFiltered {len(similarities) - len(filtered_indices)} chunks below cutoff {similarity_cutoff}")
-
-                # Sort remaining ones by similarity
-                sorted_indices = sorted(filtered_indices, key=lambda i: similarities[i], reverse=True)[:max_n_retreivals]
-
-                # Collect top chunks with similarity
-                for idx, i in enumerate(sorted_indices):
-                    chunk_text = chunk_texts[i]
-                    sim_score = similarities[i]
-                    chunk_id = results["ids"][i]
-                    doc_id = chunk_id.split("_")[0]
-                    try:
-                        doc_id = int(doc_id)
-                        doc_name = await self.get_doc_name(doc_id)
-                    except ValueError:
-                        doc_name = f"#{idx+1} [Similarity: {sim_score:.3f}]"
-                    source_nodes_dict[doc_name] = chunk_text
-                    top_chunks.append(chunk_text)
-                    top_chunks_with_scores.append(f"[Similarity: {sim_score:.3f}]\n{chunk_text}")
-            else:
+            # Resolve all source document names with one lookup
+            doc_ids = [chunk_id.split("_")[0] for chunk_id, _, _ in retrieved]
+            doc_names = await self.get_doc_names([int(d) for d in doc_ids if d.isdigit()])
+
+            # Collect top chunks with similarity
+            for idx, (chunk_id, chunk_text, sim_score) in enumerate(retrieved):
+                doc_id = doc_ids[idx]
+                doc_name = doc_names.get(int(doc_id)) if doc_id.isdigit() else None
+                if doc_name is None:
+                    doc_name = f"#{idx+1} [Similarity: {sim_score:.3f}]"
+                source_nodes_dict[doc_name] = chunk_text
+                top_chunks.append(chunk_text)
+                top_chunks_with_scores.append(f"[Similarity: {sim_score:.3f}]\n{chunk_text}")
+            if not retrieved:
                 # No embeddings found — continue with empty context
-                print("No documents indexed — continuing without context.")
+                print("No relevant chunks retrieved — continuing without context.")
 
             # If reranking is enabled
             if rerank_enabled and top_chunks:
@@ -147,7 +207,8 @@ class RAGConsumer(AsyncConsumer):
                 original_mapping = dict(source_nodes_dict)
                 
                 # Rerank
-                top_chunks = rerank_minilm(query=query, texts=top_chunks, threshold=rerank_score_threshold, return_scores=False)
+                top_chunks = await asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(rerank_minilm, query=query, texts=top_chunks, threshold=rerank_score_threshold, return_scores=False))
                 print(f"len(top_chunks) after rerank: {len(top_chunks)}\n")
                 
                 # Update source_nodes_dict
@@ -194,21 +255,56 @@ class RAGConsumer(AsyncConsumer):
             full_response = ""
 
         print("\n\nRESPONSE GENERATION COMPLETED\n\n")
-        try:
-            full_response = full_response.strip()
-            if chat_mode == "rag":
-                message_id = await self.create_chat_message(full_response, rag_response=True, source_nodes=json.dumps(source_nodes_dict))
-            elif chat_mode == "database":
-                message_id = await self.create_chat_message(full_response, rag_response=True, source_nodes=json.dumps(source_nodes_dict))
-            elif chat_mode == "standard":
-                message_id = await self.create_chat_message(full_response, rag_response=True)
+        full_response = full_response.strip()
+        message_id = None
+        if not full_response:
+            # Stopped (or failed) before anything was streamed: nothing to save
+            print("Empty response - no message saved")
+        elif chat_mode in ("rag", "database"):
+            message_id = await self.create_chat_message(full_response, rag_response=True, source_nodes=json.dumps(source_nodes_dict))
+        elif chat_mode == "standard":
+            message_id = await self.create_chat_message(full_response, rag_response=True)
 
-            await self.send({
-                "type": "websocket.send",
-                "text": json.dumps({"message_id": message_id, "mode": "last"})
-            })
-        except Exception as e:
-            print("Failed to create message:", e)
+        await self._send_last(message_id)
+
+    async def _load_history_and_store_query(self, query):
+        # History is loaded first, so it does not include the message being answered
+        await self.get_history(history_size=history_size)
+        await self.create_chat_message(query, rag_response=False, source_nodes=None)
+
+    async def _retrieve_for_text(self, text, similarity_cutoff):
+        # Encoded on the embedding service worker; concurrent queries are batched and the event loop stays free
+        query_emb = await embedding_service.encode(text)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(retrieve_chunks, self.collection, query_emb, similarity_cutoff, max_n_retreivals, loc=self.thread.loc))
+
+    async def _retrieve_rag_chunks(self, query, similarity_cutoff):
+        """
+        Keyword extraction -> embedding -> retrieval for a RAG query.
+        With parallel_raw_query_retrieval, the raw query is retrieved concurrently and both result lists
+        are merged by chunk id (best similarity wins).
+        """
+        raw_task = None
+        if parallel_raw_query_retrieval:
+            raw_task = asyncio.ensure_future(self._retrieve_for_text(query, similarity_cutoff))
+        try:
+            extracted_query = await self.keyword_extractor_async(query, llm_url, keyword_extractor_prompt)
+            print(f"\n\nextracted_query: {extracted_query}\n\n")
+            if raw_task is not None and extracted_query == query:
+                return await raw_task
+            retrieved = await self._retrieve_for_text(extracted_query, similarity_cutoff)
+            if raw_task is None:
+                return retrieved
+            retrieved = retrieved + await raw_task
+        finally:
+            if raw_task is not None and not raw_task.done():
+                raw_task.cancel()
+
+        merged = {}
+        for chunk_id, chunk_text, sim_score in retrieved:
+            if chunk_id not in merged or sim_score > merged[chunk_id][2]:
+                merged[chunk_id] = (chunk_id, chunk_text, sim_score)
+        return sorted(merged.values(), key=lambda r: r[2], reverse=True)[:max_n_retreivals]
 
     async def _stream_response(self, streamer, timeout=20):
         loop = asyncio.get_event_loop()
@@ -364,6 +460,9 @@ The query results above are the authoritative source. If it says "14", your answ
             "presence_penalty": 1.5,
             "chat_template_kwargs": {"enable_thinking": False}
         }
+        if stop_sequence:
+            # vLLM cuts generation server-side; the stream loop still checks in case the server ignores it
+            payload["stop"] = [stop_sequence]
         return payload
 
 
@@ -372,7 +471,6 @@ The query results above are the authoritative source. If it says "14", your answ
         """
         Stream response from LLM API and send over WebSocket in chunks
         """
-        llm_url += "/chat/completions"
         payload = self.build_payload(
             prompt,
             chat_history=chat_history,
@@ -382,60 +480,79 @@ The query results above are the authoritative source. If it says "14", your answ
             is_database_mode=is_database_mode
         )
 
-        headers = {"Content-Type": "application/json"}
-        full_response = ""
+        response_parts = []  # Text already sent to the client
+        pending = ""  # Received but not sent yet; ends with any possible start of the stop sequence
         counter = 0
+        flush_interval = stream_flush_interval_ms / 1000
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+
+        async def flush(text):
+            nonlocal last_flush
+            last_flush = loop.time()
+            if not text:
+                return
+            response_parts.append(text)
+            encrypted_chunk = encrypt_AES_ECB(text, aes_key).decode("utf-8")
+            await self.send({
+                "type": "websocket.send",
+                "text": json.dumps({
+                    "message": encrypted_chunk,
+                    "username": username,
+                    "mode": "continue"
+                })
+            })
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(llm_url, json=payload, headers=headers) as resp:
-                async for line_bytes in resp.content:
-                    line = line_bytes.decode("utf-8").strip()
-                    if not line:
-                        continue
-                    if line.startswith("data: "):
-                        data_str = line[len("data: "):].strip()
-                        if data_str == "[DONE]":
-                            break
-                        try:
-                            data_json = json.loads(data_str)
-                            chunk = data_json["choices"][0]["delta"].get("content", "")
-                            if not chunk:
-                                continue
-
-                            full_response += chunk
-                            counter += 1
-
-                            if counter == 1:
-                                await self.send({
-                                    "type": "websocket.send",
-                                    "text": json.dumps({
-                                        "message": "",
-                                        "username": username,
-                                        "mode": "new"
-                                    })
-                                })
-
-                            if stop_sequence in full_response:
-                                full_response = full_response.split(stop_sequence)[0]
-                                break
-
-                            encrypted_chunk = encrypt_AES_ECB(chunk, aes_key).decode("utf-8")
-                            await self.send({
-                                "type": "websocket.send",
-                                "text": json.dumps({
-                                    "message": encrypted_chunk,
-                                    "username": username,
-                                    "mode": "continue"
-                                })
-                            })
-                        except Exception as e:
-                            print("Error decoding stream chunk:", e)
-                            continue
+        stopped = False
+        cancelled = False
+        stream = stream_chat_completion(llm_url, payload)
+        try:
+            async for chunk in stream:
+                counter += 1
+
+                if counter == 1:
+                    await self.send({
+                        "type": "websocket.send",
+                        "text": json.dumps({
+                            "message": "",
+                            "username": username,
+                            "mode": "new"
+                        })
+                    })
+
+                # Only the unsent tail is scanned, never the whole response
+                pending += chunk
+                stop_idx = pending.find(stop_sequence) if stop_sequence else -1
+                if stop_idx != -1:
+                    pending = pending[:stop_idx]
+                    stopped = True
+                    break
+
+                # Hold back a suffix that could still grow into the stop sequence, so it is never sent
+                sendable = len(pending) - _stop_prefix_len(pending, stop_sequence)
+                # Deltas are coalesced into one encrypted frame per flush interval / min chars (both 0: one frame per delta)
+                if sendable >= stream_flush_min_chars or loop.time() - last_flush >= flush_interval:
+                    await flush(pending[:sendable])
+                    pending = pending[sendable:]
+        except asyncio.CancelledError:
+            # Stop button or websocket disconnect: keep what the client has already received
+            cancelled = True
+            print("Generation cancelled - LLM stream aborted")
+        finally:
+            await stream.aclose()
+
+        if not cancelled:
+            await flush(pending)
+        if stopped:
+            print("Stop sequence reached")
+        full_response = "".join(response_parts)
         return full_response
 
 
     async def websocket_disconnect(self, event):
         print("disconnected", event)
+        self.disconnected = True
+        await self._stop_generation()
 
     @database_sync_to_async
     def get_thread(self, chat_id):
@@ -491,12 +608,11 @@ The query results above are the authoritative source. If it says "14", your answ
         if isinstance(message_id, str):
             message_id = message_id.replace(',', '')
         translation_task = await self.get_message(message_id)
-        encrypted_aes_key = dict_data.get("encrypted_aes_key")
-        aes_key = decrypt_aes_key(encrypted_aes_key)
+        aes_key = self._message_aes_key(dict_data)
         
         # Choose translation method based on translation_mode
         if translation_mode == "llm":
-            persian_translation = self.llm_translate(translation_task)
+            persian_translation = await self.llm_translate(translation_task)
         else:  # Default to argos
             persian_translation = translate_en_fa(translation_task)
         
@@ -520,8 +636,7 @@ The query results above are the authoritative source. If it says "14", your answ
         if isinstance(message_id, str):
             message_id = message_id.replace(',', '')
         contexts = await self.get_context(message_id)
-        encrypted_aes_key = dict_data.get("encrypted_aes_key")
-        aes_key = decrypt_aes_key(encrypted_aes_key)
+        aes_key = self._message_aes_key(dict_data)
         try:
             contexts = json.loads(contexts)
         except:
@@ -544,19 +659,17 @@ The query results above are the authoritative source. If it says "14", your answ
         return ChatMessage.objects.get(id=message_id).source_nodes
 
     @database_sync_to_async
-    def get_doc_name(self, doc_id):
-        return Document.objects.get(id=doc_id).name
+    def get_doc_names(self, doc_ids):
+        return get_document_names(doc_ids)
 
 
-    def keyword_extractor(self, text, llm_url, keyword_extractor_prompt):
+    def _keyword_extractor_payload(self, text, keyword_extractor_prompt):
         global model_name
-        endpoint = llm_url.rstrip("/") + "/chat/completions"
-
         messages = [
             {"role": "system", "content": "You are a keyword extraction assistant."},
             {"role": "user", "content": f"{keyword_extractor_prompt}User: {text}\nKeywords:"}
         ]
-        payload = {
+        return {
             "model": model_name,
             "messages": messages,
             "temperature": 0.7,
@@ -565,27 +678,44 @@ The query results above are the authoritative source. If it says "14", your answ
             "chat_template_kwargs": {"enable_thinking": False}
         }
 
-        headers = {"Content-Type": "application/json"}
-
-        resp = requests.post(endpoint, json=payload, headers=headers)
-        if resp.status_code != 200:
-            raise RuntimeError(f"Keyword extractor failed {resp.status_code}: {resp.text}")
-
-        data = resp.json()
+    @staticmethod
+    def _parse_keywords(data):
         generated_text = data["choices"][0]["message"]["content"].strip()
-
         if "Keywords:" in generated_text:
-            extracted_keywords = generated_text.split("Keywords:")[-1].strip()
-        else:
-            extracted_keywords = generated_text
+            return generated_text.split("Keywords:")[-1].strip()
+        return generated_text
 
+    async def keyword_extractor_async(self, text, llm_url, keyword_extractor_prompt):
+        """
+        Non-blocking keyword extraction on the pooled aiohttp session.
+        Cached results and short keyword-like queries skip the LLM call.
+        Falls back to the raw query text if the LLM fails or does not answer within keyword_extractor_timeout.
+        """
+        cached = keyword_cache.get(text)
+        if cached is not None:
+            print("Extracted Keywords (cached):", cached)
+            return cached
+
+        extracted_keywords = local_keywords(text, max_words=keyword_local_max_words) if keyword_local_max_words > 0 else None
+        if extracted_keywords is not None:
+            keyword_cache.local_extractions += 1
+        else:
+            payload = self._keyword_extractor_payload(text, keyword_extractor_prompt)
+            try:
+                data = await post_chat_completion(llm_url, payload, timeout=keyword_extractor_timeout)
+                extracted_keywords = self._parse_keywords(data)
+            except (asyncio.TimeoutError, aiohttp.ClientError, RuntimeError, KeyError, IndexError) as e:
+                print(f"Keyword extraction failed, using the raw query: {e}")
+                return text
+            keyword_cache.llm_extractions += 1
+
+        keyword_cache.set(text, extracted_keywords)
         print("Extracted Keywords:", extracted_keywords)
         return extracted_keywords
 
-    def llm_translate(self, text):
+    async def llm_translate(self, text):
         """Translate text to Persian using LLM."""
         global model_name, translation_prompt
-        endpoint = llm_url.rstrip("/") + "/chat/completions"
 
         messages = [
             {"role": "system", "content": "You are a professional English to Persian translator."},
@@ -600,16 +730,8 @@ The query results above are the authoritative source. If it says "14", your answ
             "chat_template_kwargs": {"enable_thinking": False}
         }
 
-        headers = {"Content-Type": "application/json"}
-
         try:
-            resp = requests.post(endpoint, json=payload, headers=headers)
-            if resp.status_code != 200:
-                print(f"LLM translation failed {resp.status_code}: {resp.text}")
-                # Fallback to argos if LLM fails
-                return translate_en_fa(text)
-
-            data = resp.json()
+            data = await post_chat_completion(llm_url, payload, timeout=llm_read_timeout)
             translated_text = data["choices"][0]["message"]["content"].strip()
             print("LLM Translation completed")
             return translated_text
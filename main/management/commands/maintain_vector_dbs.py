@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from main.utilities.maintenance import run_vector_db_maintenance
+
+
+class Command(BaseCommand):
+    help = ("Delete vector DB directories of deleted threads and ensure the all-docs collection exists. "
+            "Run once (e.g. from cron) or keep running with --interval.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=0,
+                            help="Seconds between runs; 0 runs once and exits")
+        parser.add_argument("--min-age", type=int, default=600,
+                            help="Skip directories modified within this many seconds")
+        parser.add_argument("--dry-run", action="store_true", help="Only report orphaned directories")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = run_vector_db_maintenance(min_age=options["min_age"], dry_run=options["dry_run"])
+            self.stdout.write(
+                f"Vector DB maintenance: {stats['orphaned_found']} orphaned, {stats['orphaned_deleted']} deleted, "
+                f"{stats['delete_errors']} errors, all-docs collection ok: {stats['all_docs_collection_ok']} "
+                f"({stats['duration_s']}s)"
+            )
+            if options["interval"] <= 0:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,60 @@
+import time
+import threading
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from main.utilities.variables import indexing_worker_concurrency, indexing_job_stale_after
+from main.utilities.indexing import claim_next_job, requeue_stale_jobs, run_job, default_worker_name, indexing_logger
+
+
+class Command(BaseCommand):
+    help = "Process queued IndexingJobs (uploaded documents) in the background."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=indexing_worker_concurrency,
+                            help="Jobs processed in parallel by this worker")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty")
+        parser.add_argument("--stale-after", type=int, default=indexing_job_stale_after,
+                            help="Requeue running jobs without a heartbeat for this many seconds")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        worker_name = default_worker_name()
+        requeue_stale_jobs(options["stale_after"])
+        self.stdout.write(f"Indexing worker {worker_name} started with concurrency {options['concurrency']}")
+
+        stop_event = threading.Event()
+        threads = [
+            threading.Thread(target=self._work, args=(f"{worker_name}#{i}", options, stop_event), daemon=True)
+            for i in range(max(options["concurrency"], 1))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            # Running jobs stay "running" and are requeued by the next worker once their heartbeat is stale
+            stop_event.set()
+            self.stdout.write("Stopping indexing worker...")
+
+    def _work(self, worker_name, options, stop_event):
+        last_requeue = time.time()
+        while not stop_event.is_set():
+            close_old_connections()
+            if time.time() - last_requeue > options["stale_after"]:
+                requeue_stale_jobs(options["stale_after"])
+                last_requeue = time.time()
+            try:
+                job = claim_next_job(worker_name)
+            except Exception as e:
+                indexing_logger.error(f"Could not claim an indexing job: {e}")
+                job = None
+            if job is None:
+                if options["once"]:
+                    return
+                stop_event.wait(options["poll_interval"])
+                continue
+            run_job(job, heartbeat_interval=max(options["stale_after"] / 3, 1))
+        close_old_connections()
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.9 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0013_collection_collection_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_loc', models.CharField(max_length=512)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=16)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=128, null=True)),
+                ('heartbeat', models.DateTimeField(blank=True, null=True)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+                ('time_started', models.DateTimeField(blank=True, null=True)),
+                ('time_finished', models.DateTimeField(blank=True, null=True)),
+                ('collection', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='main.collection')),
+                ('thread', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='main.thread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IndexingJobFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256)),
+                ('loc', models.CharField(max_length=512)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('n_chunks', models.IntegerField(default=0)),
+                ('time_finished', models.DateTimeField(blank=True, null=True)),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main.document')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='main.indexingjob')),
+            ],
+        ),
+    ]
@@ -73,4 +73,55 @@ class ChatMessage(models.Model):
     rag_response = models.BooleanField(default=False)
     message     =  models.TextField()
     timestamp   =  models.DateTimeField(auto_now_add=True)
-    source_nodes = models.JSONField(null=True, blank=True)
\ No newline at end of file
+    source_nodes = models.JSONField(null=True, blank=True)
+
+class IndexingJob(models.Model):
+    """Uploaded files waiting to be indexed into a thread or a collection by `manage.py run_indexing_worker`."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user =          models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    thread =        models.ForeignKey(Thread, null=True, blank=True, on_delete=models.CASCADE)
+    collection =    models.ForeignKey(Collection, null=True, blank=True, on_delete=models.CASCADE)
+    target_loc =    models.CharField(max_length=512)  # Chroma directory the chunks are written to
+    status =        models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    error =         models.TextField(null=True, blank=True)
+    worker =        models.CharField(max_length=128, null=True, blank=True)
+    heartbeat =     models.DateTimeField(null=True, blank=True)  # Refreshed while running; stale jobs are requeued
+    time_created =  models.DateTimeField(auto_now_add=True)
+    time_started =  models.DateTimeField(null=True, blank=True)
+    time_finished = models.DateTimeField(null=True, blank=True)
+
+
+class IndexingJobFile(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_SKIPPED = 'skipped'  # Could not be loaded (timeout / parser error)
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_SKIPPED, 'Skipped'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job =           models.ForeignKey(IndexingJob, related_name='files', on_delete=models.CASCADE)
+    name =          models.CharField(max_length=256)
+    loc =           models.CharField(max_length=512)
+    status =        models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error =         models.TextField(null=True, blank=True)
+    document =      models.ForeignKey(Document, null=True, blank=True, on_delete=models.SET_NULL)
+    n_chunks =      models.IntegerField(default=0)
+    time_finished = models.DateTimeField(null=True, blank=True)
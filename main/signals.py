@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from main.models import Document
+from main.utilities.document_names import invalidate_document_name
+
+
+@receiver(post_save, sender=Document)
+def document_saved(sender, instance, **kwargs):
+    invalidate_document_name(instance.id)
+
+
+@receiver(post_delete, sender=Document)
+def document_deleted(sender, instance, **kwargs):
+    invalidate_document_name(instance.id)
@@ -1,3 +1,138 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase
+from main.utilities.caching import LRUCache
+from main.utilities.embedding_store import EmbeddingStore
+from main.utilities.keywords import normalize_query, local_keywords
+from main.utilities.retrieval import _top_indices
+from main.consumers import _stop_prefix_len
 
-# Create your tests here.
+
+class FakeChromaCollection:
+    """The part of the Chroma collection API used by EmbeddingStore.sync()."""
+
+    def __init__(self, embeddings):
+        self.embeddings = dict(embeddings)
+
+    def get(self, ids=None, include=()):
+        ids = list(self.embeddings) if ids is None else list(ids)
+        return {"ids": ids, "embeddings": [self.embeddings[chunk_id] for chunk_id in ids]}
+
+    def count(self):
+        return len(self.embeddings)
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_entries_expire_after_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=10)
+        with mock.patch("main.utilities.caching.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with mock.patch("main.utilities.caching.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("main.utilities.caching.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+class EmbeddingStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.loc = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.loc, ignore_errors=True)
+
+    def assert_scores(self, store, query, expected):
+        ids, _ = store.open()
+        scores = dict(zip(ids, store.scores(query)))
+        self.assertEqual(set(scores), set(expected))
+        for chunk_id, score in expected.items():
+            self.assertAlmostEqual(float(scores[chunk_id]), score, places=3)
+
+    def test_append_and_reopen(self):
+        collection = FakeChromaCollection({"x": [1, 0, 0], "y": [0, 2, 0]})
+        self.assertEqual(EmbeddingStore(self.loc, dtype="float32").sync(collection), 2)
+
+        collection.embeddings["z"] = [0, 0, 3]
+        store = EmbeddingStore(self.loc, dtype="float32")
+        self.assertEqual(store.sync(collection), 1)
+        self.assertEqual(store.sync(collection), 0)
+
+        reopened = EmbeddingStore(self.loc, dtype="float32")
+        self.assertEqual(len(reopened), 3)
+        self.assert_scores(reopened, [0, 1, 0], {"x": 0.0, "y": 1.0, "z": 0.0})
+
+    def test_orphan_rows_of_an_interrupted_sync_are_dropped(self):
+        collection = FakeChromaCollection({"x": [1, 0, 0]})
+        store = EmbeddingStore(self.loc, dtype="float32")
+        store.sync(collection)
+        # Crash between the two writes: a row was appended to vectors.bin but its id never reached ids.txt
+        with open(store.vectors_path, "ab") as f:
+            f.write(np.array([[0, 0, 1]], dtype=np.float32).tobytes())
+
+        collection.embeddings["y"] = [0, 1, 0]
+        store.sync(collection)
+        self.assertEqual(os.path.getsize(store.vectors_path), 2 * 3 * 4)
+        self.assert_scores(store, [0, 1, 0], {"x": 0.0, "y": 1.0})
+
+    def test_dtype_change_rebuilds_the_store(self):
+        collection = FakeChromaCollection({"x": [1, 0, 0], "y": [0, 1, 0]})
+        EmbeddingStore(self.loc, dtype="float32").sync(collection)
+
+        collection.embeddings["z"] = [0, 0, 1]
+        store = EmbeddingStore(self.loc, dtype="float16")
+        self.assertEqual(store.sync(collection), 3)
+        _, matrix = store.open()
+        self.assertEqual(matrix.dtype, np.float16)
+        self.assert_scores(store, [0, 0, 1], {"x": 0.0, "y": 0.0, "z": 1.0})
+
+    def test_removed_chunks_rebuild_the_store(self):
+        collection = FakeChromaCollection({"x": [1, 0, 0], "y": [0, 1, 0]})
+        store = EmbeddingStore(self.loc, dtype="float32")
+        store.sync(collection)
+        del collection.embeddings["x"]
+        store.sync(collection)
+        self.assertEqual(store.open()[0], ["y"])
+
+
+class KeywordTests(SimpleTestCase):
+    def test_cache_key_keeps_symbols(self):
+        keys = {normalize_query("What is C++?"), normalize_query("What is C#?"), normalize_query("what is c")}
+        self.assertEqual(len(keys), 3)
+
+    def test_cache_key_ignores_case_width_and_spacing(self):
+        self.assertEqual(normalize_query("  What   IS\tＣ++?"), normalize_query("what is c++?"))
+
+    def test_local_keywords(self):
+        self.assertEqual(local_keywords("What is C++?", max_words=4), "C++")
+        self.assertEqual(local_keywords("tell me about .NET", max_words=4), ".NET")
+        self.assertEqual(local_keywords("حافظه کاری چیست؟", max_words=4), "حافظه کاری")
+        self.assertIsNone(local_keywords("what is it?", max_words=4))
+        self.assertIsNone(local_keywords("one two three four five", max_words=4))
+
+
+class StreamingTests(SimpleTestCase):
+    def test_stop_prefix_len(self):
+        self.assertEqual(_stop_prefix_len("Hello Hu", "Human:"), 2)
+        self.assertEqual(_stop_prefix_len("Hello Human", "Human:"), 5)
+        self.assertEqual(_stop_prefix_len("Hello", "Human:"), 0)
+        self.assertEqual(_stop_prefix_len("Hello H", None), 0)
+        self.assertEqual(_stop_prefix_len("Hello H", ""), 0)
+
+
+class RetrievalTests(SimpleTestCase):
+    def test_top_indices_applies_cutoff_and_order(self):
+        similarities = np.array([0.1, 0.9, 0.5, 0.7, 0.3], dtype=np.float32)
+        self.assertEqual(list(_top_indices(similarities, 0.4, 2)), [1, 3])
+        self.assertEqual(list(_top_indices(similarities, 0.4, 10)), [1, 3, 2])
+        self.assertEqual(list(_top_indices(similarities, 0.95, 2)), [])
@@ -1,6 +1,8 @@
 from django.urls import path
 from .views import *
 from .views_progress import indexing_progress_view
+from .views_metrics import metrics_view
+from .views_history import chat_history_view
 from rest_framework.authtoken.views import obtain_auth_token
 from .views import *
 
@@ -9,6 +11,7 @@ app_name = 'main'
 urlpatterns = [
     path('', chat_view, name='main_chat'),
     path('<int:thread_id>/', chat_view, name='chat'),
+    path('<int:thread_id>/history/', chat_history_view, name='chat_history'),
     path('create_rag', create_rag_view, name='create_rag'),
     path('Add_docs?thread_id=<int:thread_id>/', add_docs_view, name='add_docs'),
     path('delete_thread?thread_id=<int:thread_id>/', delete_view, name='delete_thread'),
@@ -20,6 +23,7 @@ urlpatterns = [
     path('delete_collection?collection_id=<int:collection_id>/', collection_delete_view, name='delete_collection'),
     path('download_file?collection_id=<int:collection_id>&file_index=<int:file_index>/', collection_download_file, name='collection_download_file'),
     path('indexing-progress/', indexing_progress_view, name='indexing_progress'),
+    path('metrics/', metrics_view, name='metrics'),
     # User management URLs
     path('users/', users_list, name='users_list'),
     path('users/create/', user_create, name='user_create'),
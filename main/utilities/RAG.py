@@ -1,11 +1,5 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-# from transformers import AutoModelForCausalLM, TextStreamer, 
-from sentence_transformers import CrossEncoder
+# Heavy model libraries (transformers, sentence_transformers) are imported inside the loaders below
 from huggingface_hub import login
-from llama_index.embeddings.langchain import LangchainEmbedding
-from langchain_huggingface import HuggingFaceEmbeddings
-from chromadb.utils import embedding_functions
-from sentence_transformers import SentenceTransformer
 from main.models import Thread, Document
 import chromadb
 from pathlib import Path
@@ -16,6 +10,7 @@ from pprint import pprint
 from main.models import Collection
 from users.models import User
 from main.utilities.variables import INDEXING_CHUNK_SIZE, INDEXING_CHUNK_OVERLAP
+from main.utilities.model_registry import model_registry
 from typing import List, Tuple, Optional, Union
 
 
@@ -25,26 +20,83 @@ all_docs_collection_path = os.path.join("collections", all_docs_collection_name)
 
 
 embedding_model_name = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-embedding_model_lc = LangchainEmbedding(HuggingFaceEmbeddings(
-    model_name=embedding_model_name,
-    model_kwargs={'local_files_only': True}
-))
-embedding_model_st = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2", local_files_only=True)
-embedding_model_st2 = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="paraphrase-multilingual-MiniLM-L12-v2"
-)
+reranker_name = "Alibaba-NLP/gte-multilingual-reranker-base"
+minilm_reranker_name = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
 
-# Load model & tokenizer once (outside the function for efficiency)
-reranker_name = "Alibaba-NLP/gte-multilingual-reranker-base"
-tokenizer = AutoTokenizer.from_pretrained(reranker_name, local_files_only=True)
-reranker = AutoModelForSequenceClassification.from_pretrained(
-    reranker_name, trust_remote_code=True, torch_dtype=torch.float16, local_files_only=True
-)
-reranker.eval()
+# Models are loaded on first use through model_registry (see MainConfig.ready() for optional warm-up)
+def _load_embedding_encoder():
+    from main.utilities.embeddings import SharedEncoder
+    return SharedEncoder(embedding_model_name, local_files_only=True)
+
+
+def _load_embedding_model_lc():
+    # Wraps the shared encoder instead of loading its own copy
+    from llama_index.embeddings.langchain import LangchainEmbedding
+    from main.utilities.embeddings import LangchainEncoderAdapter
+    return LangchainEmbedding(LangchainEncoderAdapter(get_embedding_encoder()))
+
+
+def _load_chroma_embedding_function():
+    from main.utilities.embeddings import ChromaEncoderAdapter
+    return ChromaEncoderAdapter(get_embedding_encoder())
+
+
+def _load_alibaba_reranker():
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    tokenizer = AutoTokenizer.from_pretrained(reranker_name, local_files_only=True)
+    reranker = AutoModelForSequenceClassification.from_pretrained(
+        reranker_name, trust_remote_code=True, torch_dtype=torch.float16, local_files_only=True
+    )
+    reranker.eval()
+    return tokenizer, reranker
+
+
+def _load_minilm_reranker():
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(minilm_reranker_name)
+
+
+model_registry.register("embedding_encoder", _load_embedding_encoder)
+model_registry.register("embedding_model_lc", _load_embedding_model_lc)
+model_registry.register("chroma_embedding_function", _load_chroma_embedding_function)
+model_registry.register("alibaba_reranker", _load_alibaba_reranker)
+model_registry.register("minilm_reranker", _load_minilm_reranker)
+
+
+def get_embedding_encoder():
+    return model_registry.get("embedding_encoder")
+
+
+def get_embedding_model_lc():
+    return model_registry.get("embedding_model_lc")
+
+
+def get_chroma_embedding_function():
+    return model_registry.get("chroma_embedding_function")
+
+
+def warm_up_models(names=None):
+    """Load models now instead of on first use (default: every registered model)."""
+    model_registry.warm_up(names)
+
+
+# Backwards-compatible module attributes; each access goes through the lazy registry
+_lazy_attributes = {
+    "embedding_model_st": lambda: get_embedding_encoder(),
+    "embedding_encoder": lambda: get_embedding_encoder(),
+    "embedding_model_lc": lambda: get_embedding_model_lc(),
+    "embedding_model_st2": lambda: get_chroma_embedding_function(),
+    "tokenizer": lambda: model_registry.get("alibaba_reranker")[0],
+    "reranker": lambda: model_registry.get("alibaba_reranker")[1],
+    "minilm_reranker": lambda: model_registry.get("minilm_reranker"),
+}
+
 
-# Load MiniLM CrossEncoder once (fast to reuse)
-minilm_reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+def __getattr__(name):
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ------- END of NameSpaces -------
 
@@ -65,6 +117,7 @@ def load_model(model_name="TheBloke/Llama-2-7b-Chat-GPTQ", device='gpu'):
 
     login(token=hf_token)
 
+    from transformers import AutoTokenizer, AutoModelForCausalLM, TextStreamer
     # Create tokenizer
     tokenizer = AutoTokenizer.from_pretrained(model_name
         ,device_map='cuda'                 
@@ -136,7 +189,7 @@ def create_all_docs_collection():
     exist = Collection.objects.filter(name=all_docs_collection_name).exists() and os.path.exists(all_docs_collection_path)
     if not exist:
         db = chromadb.PersistentClient(path=all_docs_collection_path)
-        chroma_collection = db.get_or_create_collection("default", embedding_function=embedding_model_st2)
+        chroma_collection = db.get_or_create_collection("default", embedding_function=get_chroma_embedding_function())
         all_docs_creator = User.objects.filter(username="admin").first()
         if all_docs_creator == None:
             all_docs_creator = User.objects.filter(groups__name='Admin').first()
@@ -181,7 +234,7 @@ def index_builder(vdb_path: str):
     # Settings.llm = llm
     Settings.chunk_size = INDEXING_CHUNK_SIZE
     Settings.chunk_overlap = INDEXING_CHUNK_OVERLAP
-    Settings.embed_model = embedding_model_lc
+    Settings.embed_model = get_embedding_model_lc()
     # Settings.embed_model = embedding_model_st2
 
     # Setup Chroma
@@ -242,6 +295,7 @@ def rerank_alibaba(query: str, texts: List[str], threshold: Optional[float] = No
             - Tuple[List[str], List[float]] (if return_scores=True)
     """
     pairs = [(query, doc) for doc in texts]
+    tokenizer, reranker = model_registry.get("alibaba_reranker")
 
     with torch.no_grad():
         inputs = tokenizer(
@@ -282,7 +336,7 @@ def rerank_minilm(query: str, texts: List[str], threshold: Optional[float] = Non
     pairs = [(query, doc) for doc in texts]
 
     # Get relevance scores
-    scores = minilm_reranker.predict(pairs).tolist()
+    scores = model_registry.get("minilm_reranker").predict(pairs).tolist()
 
     # Zip texts with scores and sort
     ranked = sorted(zip(texts, scores), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,125 @@
+"""
+Content-addressed cache of document chunks and their embeddings.
+
+Entries are keyed by (file sha256, chunk size, chunk overlap, embedding model), so a file uploaded again to
+another thread or collection is indexed by copying its cached vectors - the loader and the encoder are skipped.
+
+Layout of <cache_dir>/<key[:2]>/<key>/:
+    chunks.json      [{"source": idx, "text": ..., "start": ..., "end": ...}, ...] in node order
+    embeddings.npy   float32 matrix, one row per chunk
+"""
+import os
+import json
+import shutil
+import hashlib
+import threading
+import numpy as np
+from typing import List, Optional
+
+
+class CachedChunks:
+    def __init__(self, chunks: List[dict], embeddings: np.ndarray):
+        self.chunks = chunks
+        self.embeddings = embeddings
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def nodes(self, doc_id) -> list:
+        """Rebuild the chunk nodes for a new Document id, with the same ids as split_documents() would give."""
+        from llama_index.core.schema import TextNode, NodeRelationship, RelatedNodeInfo
+
+        nodes, counters = [], {}
+        for chunk in self.chunks:
+            source_id = f"{doc_id}_{chunk['source']}"
+            n = counters.get(source_id, 0)
+            counters[source_id] = n + 1
+            nodes.append(TextNode(
+                id_=f"{source_id}_{n}",
+                text=chunk["text"],
+                start_char_idx=chunk.get("start"),
+                end_char_idx=chunk.get("end"),
+                relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=source_id)},
+            ))
+        return nodes
+
+
+class ChunkCache:
+    def __init__(self, cache_dir: str, chunk_size: int, chunk_overlap: int, model_name: str):
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, sha256: str) -> str:
+        key = hashlib.sha256(json.dumps([sha256, self.chunk_size, self.chunk_overlap, self.model_name]).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def contains(self, sha256: str) -> bool:
+        return os.path.exists(os.path.join(self._entry_dir(sha256), "embeddings.npy"))
+
+    def get(self, sha256: str) -> Optional[CachedChunks]:
+        entry_dir = self._entry_dir(sha256)
+        try:
+            with open(os.path.join(entry_dir, "chunks.json"), "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            embeddings = np.load(os.path.join(entry_dir, "embeddings.npy"))
+        except (FileNotFoundError, ValueError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+        if len(chunks) != len(embeddings):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return CachedChunks(chunks, embeddings)
+
+    def set(self, sha256: str, nodes, embeddings):
+        """Store the chunks of one file; written to a temp dir and renamed, so readers never see a partial entry."""
+        from llama_index.core.schema import MetadataMode
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(nodes) == 0 or len(nodes) != len(embeddings):
+            return
+        chunks = [{"source": int(node.ref_doc_id.rsplit("_", 1)[1]),
+                   "text": node.get_content(metadata_mode=MetadataMode.NONE),
+                   "start": node.start_char_idx, "end": node.end_char_idx} for node in nodes]
+        entry_dir = self._entry_dir(sha256)
+        tmp_dir = f"{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            with open(os.path.join(tmp_dir, "chunks.json"), "w", encoding="utf-8") as f:
+                json.dump(chunks, f, ensure_ascii=False)
+            np.save(os.path.join(tmp_dir, "embeddings.npy"), embeddings)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            print(f"Chunk cache write failed: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cache_dir": self.cache_dir, "model": self.model_name}
+
+
+_chunk_cache = None
+_chunk_cache_lock = threading.Lock()
+
+
+def get_chunk_cache() -> Optional[ChunkCache]:
+    """Process-wide ChunkCache for the current chunking settings and embedding model; None when disabled."""
+    global _chunk_cache
+    from main.utilities.variables import chunk_cache_dir, INDEXING_CHUNK_SIZE, INDEXING_CHUNK_OVERLAP
+    if not chunk_cache_dir:
+        return None
+    with _chunk_cache_lock:
+        if _chunk_cache is None:
+            from main.utilities.RAG import embedding_model_name
+            _chunk_cache = ChunkCache(chunk_cache_dir, INDEXING_CHUNK_SIZE, INDEXING_CHUNK_OVERLAP, embedding_model_name)
+        return _chunk_cache
@@ -8,7 +8,7 @@ import pandas as pd
 import json
 import os
 from typing import Dict, List, Tuple, Optional, Any
-import requests
+from main.utilities.llm_client import post_chat_completion_sync
 
 
 def analyze_sqlite_schema(db_path: str) -> Dict[str, Any]:
@@ -708,8 +708,6 @@ Provide a detailed analysis in markdown format including:
 7. **Special Considerations**: Any important notes
 
 Use markdown headers (##, ###) and bullet points (-) for clear formatting."""
-
-    endpoint = llm_url.rstrip("/") + "/chat/completions"
     
     messages = [
         {"role": "system", "content": "You are a database schema analyst."},
@@ -725,10 +723,8 @@ Use markdown headers (##, ###) and bullet points (-) for clear formatting."""
         "chat_template_kwargs": {"enable_thinking": False}
     }
     
-    headers = {"Content-Type": "application/json"}
-    
     try:
-        resp = requests.post(endpoint, json=payload, headers=headers, timeout=60)
+        resp = post_chat_completion_sync(llm_url, payload, timeout=60)
         if resp.status_code != 200:
             return f"Error generating schema analysis: {resp.status_code}\n\nRaw Schema:\n{schema_json}"
         
@@ -1079,8 +1075,6 @@ Database Schema Information:
 User Question: {user_question}
 
 Generate ONLY the {query_type} query (no explanations, no markdown, no code blocks):"""
-
-    endpoint = llm_url.rstrip("/") + "/chat/completions"
     
     messages = [
         {"role": "system", "content": f"You are a {query_type} query generation expert. Generate queries based on schema and user questions."},
@@ -1097,10 +1091,8 @@ Generate ONLY the {query_type} query (no explanations, no markdown, no code bloc
         "chat_template_kwargs": {"enable_thinking": False}
     }
     
-    headers = {"Content-Type": "application/json"}
-    
     try:
-        resp = requests.post(endpoint, json=payload, headers=headers, timeout=30)
+        resp = post_chat_completion_sync(llm_url, payload, timeout=30)
         if resp.status_code != 200:
             return None
         
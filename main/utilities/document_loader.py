@@ -1,49 +1,170 @@
 """
-Document loading subprocess - isolated from Django to work with multiprocessing on Windows
+Document loading processes - isolated from Django to work with multiprocessing on Windows
+
+LoaderPool keeps a few long-lived loader processes that import llama_index (and its PDF/Office readers) once
+at startup. Each load is sent to an idle process over a pipe and its result is returned as soon as it arrives;
+a process that exceeds the timeout (or dies) is killed and replaced, so one bad file cannot block the pool.
 """
 import sys
 import os
+import time
+import queue
+import logging
+import threading
 import traceback
-import pickle
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, Future
 
 
-def load_document_subprocess(file_path, result_file):
-    """
-    Load document in separate process and save to temp file.
-    This function must be in a separate module to avoid Django import issues on Windows.
-    """
+logger = logging.getLogger('indexing')
+
+
+class TimeoutException(Exception):
+    pass
+
+
+def _warm_up_readers():
+    # Import the readers SimpleDirectoryReader dispatches to, so the first file doesn't pay for them
+    from llama_index.core import SimpleDirectoryReader  # noqa: F401
+    for module in ("pypdf", "docx2txt", "llama_index.readers.file"):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+
+def _loader_worker(conn):
+    """Main loop of a loader process: receive a file path, send back ('success', docs) or ('error', details)."""
     try:
-        # Import here to avoid loading Django in subprocess
-        from llama_index.core import SimpleDirectoryReader
-        
-        file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-        ext = os.path.splitext(file_path)[1].lower()
-        
-        print(f"[SUBPROCESS] File: {os.path.basename(file_path)}", file=sys.stderr)
-        print(f"[SUBPROCESS] Size: {file_size:.2f} MB, Type: {ext}", file=sys.stderr)
-        print(f"[SUBPROCESS] Creating SimpleDirectoryReader...", file=sys.stderr)
-        
-        reader = SimpleDirectoryReader(
-            input_files=[file_path],
-            filename_as_id=True
-        )
-        
-        print(f"[SUBPROCESS] Reader created, calling load_data()...", file=sys.stderr)
-        docs = reader.load_data()
-        
-        print(f"[SUBPROCESS] ✓ Loaded {len(docs)} document chunks", file=sys.stderr)
-        
-        # Save to temporary file instead of queue (avoids serialization issues)
-        print(f"[SUBPROCESS] Saving results to temp file...", file=sys.stderr)
-        with open(result_file, 'wb') as f:
-            pickle.dump(('success', docs), f)
-        print(f"[SUBPROCESS] ✓ Results saved successfully", file=sys.stderr)
-        
+        _warm_up_readers()
+        conn.send(("ready", os.getpid()))
     except Exception as e:
-        error_trace = traceback.format_exc()
-        print(f"[SUBPROCESS] ✗ Exception: {error_trace}", file=sys.stderr)
+        conn.send(("error", f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"))
+        return
+
+    from llama_index.core import SimpleDirectoryReader
+    while True:
+        try:
+            file_path = conn.recv()
+        except (EOFError, OSError):
+            break
+        if file_path is None:
+            break
+        try:
+            print(f"[LOADER {os.getpid()}] Loading {os.path.basename(file_path)}", file=sys.stderr)
+            docs = SimpleDirectoryReader(input_files=[file_path], filename_as_id=True).load_data()
+            conn.send(("success", docs))
+        except Exception as e:
+            # Also covers results that cannot be pickled - send() serializes before writing anything
+            conn.send(("error", f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"))
+
+
+class _LoaderProcess:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_loader_worker, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float):
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise TimeoutException(f"Loader process did not start within {timeout} seconds")
+        status, result = self.conn.recv()
+        if status != "ready":
+            raise Exception(f"Loader process failed to start: {result}")
+        self.ready = True
+
+    def kill(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.kill()
+        self.process.join(timeout=5)
+
+
+class LoaderPool:
+    """
+    Pool of pre-warmed document loader processes.
+
+    load() blocks the calling thread until the file is parsed; submit() returns a Future, so several files
+    can be parsed in parallel (at most `size` at a time) while the caller indexes the previous ones.
+    """
+
+    def __init__(self, size: int = 2, startup_timeout: float = 120, start_method: str = "spawn"):
+        self.size = max(size, 1)
+        self.startup_timeout = startup_timeout
+        # spawn: clean interpreters instead of forks of a process that holds models, threads and DB connections
+        self._ctx = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        for _ in range(self.size):
+            self._idle.put(_LoaderProcess(self._ctx))
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="document-loader")
+        self._closed = False
+        self.replaced = 0
+
+    def load(self, file_path: str, timeout: float = 60):
+        worker = self._idle.get()
+        healthy = False
         try:
-            with open(result_file, 'wb') as f:
-                pickle.dump(('error', f"{type(e).__name__}: {str(e)}\n{error_trace}"), f)
-        except:
-            pass  # If we can't even save the error, subprocess will just exit
+            worker.wait_ready(self.startup_timeout)
+            start_time = time.time()
+            worker.conn.send(file_path)
+            if not worker.conn.poll(timeout):
+                logger.warning(f"⚠ TIMEOUT after {timeout}s loading {os.path.basename(file_path)} - killing loader process")
+                raise TimeoutException(f"Document loading timed out after {timeout} seconds")
+            status, result = worker.conn.recv()
+            healthy = True
+        except (EOFError, OSError) as e:
+            raise Exception(f"Loader process terminated without result (exit code: {worker.process.exitcode}): {e}")
+        finally:
+            if healthy:
+                self._idle.put(worker)
+            else:
+                worker.kill()
+                self.replaced += 1
+                self._idle.put(_LoaderProcess(self._ctx))
+
+        if status != "success":
+            raise Exception(result)
+        logger.info(f"✓ Loaded {os.path.basename(file_path)} in {time.time() - start_time:.1f}s ({len(result)} documents)")
+        return result
+
+    def submit(self, file_path: str, timeout: float = 60) -> Future:
+        return self._executor.submit(self.load, file_path, timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.kill()
+
+
+_loader_pool = None
+_loader_pool_lock = threading.Lock()
+
+
+def get_loader_pool(size: int = 2) -> LoaderPool:
+    """Process-wide LoaderPool; created (and its processes started) on first use."""
+    global _loader_pool
+    with _loader_pool_lock:
+        if _loader_pool is None:
+            _loader_pool = LoaderPool(size=size)
+        return _loader_pool
@@ -0,0 +1,39 @@
+"""
+Process-wide Document id -> name cache, used to label retrieved chunks with their source document.
+Entries are invalidated by the Document post_save / post_delete receivers in main/signals.py.
+"""
+import threading
+from typing import Dict, Iterable
+from main.models import Document
+
+
+_document_names = {}
+_lock = threading.Lock()
+
+
+def get_document_names(doc_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Resolve document names for many ids at once.
+    Cached names are served from memory; all misses are fetched with a single query.
+    Ids without a Document row are left out of the result.
+    """
+    doc_ids = set(doc_ids)
+    with _lock:
+        names = {doc_id: _document_names[doc_id] for doc_id in doc_ids if doc_id in _document_names}
+    missing = doc_ids - names.keys()
+    if missing:
+        fetched = dict(Document.objects.filter(id__in=missing).values_list("id", "name"))
+        with _lock:
+            _document_names.update(fetched)
+        names.update(fetched)
+    return names
+
+
+def invalidate_document_name(doc_id: int):
+    with _lock:
+        _document_names.pop(doc_id, None)
+
+
+def clear_document_names():
+    with _lock:
+        _document_names.clear()
@@ -0,0 +1,186 @@
+"""
+Embedding service - encodes query texts on a background worker thread with dynamic micro-batching.
+
+Concurrent callers (e.g. many websocket consumers) submit single texts; the worker collects every
+request that arrives within a short window into one batched encode() call. Async callers await
+the result without blocking the event loop.
+"""
+import asyncio
+import hashlib
+import os
+import queue
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+import numpy as np
+from main.utilities.caching import LRUCache
+from main.utilities.metrics import register_stats
+from main.utilities.variables import (
+    embedding_batch_max_size, embedding_batch_wait_ms, embedding_service_workers,
+    query_embedding_cache_size, query_embedding_cache_dir,
+)
+
+
+class EmbeddingBatcher:
+    def __init__(self, encoder_getter: Callable, max_batch_size: int = 32, max_wait_ms: float = 5.0, num_workers: int = 1):
+        """
+        Args:
+            encoder_getter: Zero-argument callable returning an object with encode(List[str]) -> np.ndarray.
+                            Called on the worker thread, so lazy model loading never blocks the caller.
+            max_batch_size: Maximum number of texts encoded in one call.
+            max_wait_ms: How long the worker waits for more requests after the first one arrives.
+            num_workers: Number of worker threads.
+        """
+        self.encoder_getter = encoder_getter
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.num_workers = max(1, num_workers)
+        self._queue = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        with self._start_lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._run, name=f"embedding-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, text: str) -> Future:
+        """Queue one text for encoding; the returned Future resolves to its 1-D embedding."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Awaitable encode of one text."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # Drop requests whose caller has already given up
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                embeddings = self.encoder_getter().encode([text for text, _ in batch])
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(np.asarray(embedding))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+def normalize_query_text(text: str) -> str:
+    """Cache-key form of a query: Unicode NFKC with whitespace runs collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed by (model name, normalized text),
+    optionally backed by .npy files in cache_dir so entries survive restarts and are shared by workers.
+    """
+
+    def __init__(self, model_name: str, maxsize: int = 4096, cache_dir: Optional[str] = None):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self._memory = LRUCache(maxsize=maxsize)
+        self.disk_hits = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, text: str):
+        return (self.model_name, normalize_query_text(text))
+
+    def _disk_path(self, key) -> str:
+        digest = hashlib.sha256("\x00".join(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self._key(text)
+        embedding = self._memory.get(key)
+        if embedding is None and self.cache_dir:
+            try:
+                embedding = np.load(self._disk_path(key))
+            except (FileNotFoundError, ValueError, OSError):
+                return None
+            self.disk_hits += 1
+            self._memory.set(key, embedding)
+        return embedding
+
+    def set(self, text: str, embedding: np.ndarray):
+        key = self._key(text)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding.setflags(write=False)  # shared between callers
+        self._memory.set(key, embedding)
+        if self.cache_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    np.save(f, embedding)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Query embedding cache write failed: {e}")
+
+    def stats(self) -> dict:
+        stats = self._memory.stats()
+        stats.update({"model": self.model_name, "disk_hits": self.disk_hits, "disk_backed": bool(self.cache_dir)})
+        return stats
+
+
+class CachedEmbeddingService:
+    """Query encoding with the embedding cache in front of the micro-batching worker."""
+
+    def __init__(self, batcher: EmbeddingBatcher, cache: QueryEmbeddingCache):
+        self.batcher = batcher
+        self.cache = cache
+
+    async def encode(self, text: str) -> np.ndarray:
+        embedding = self.cache.get(text)
+        if embedding is None:
+            embedding = await self.batcher.encode(text)
+            self.cache.set(text, embedding)
+        return embedding
+
+
+def _get_encoder():
+    from main.utilities.RAG import get_embedding_encoder
+    return get_embedding_encoder()
+
+
+def _get_model_name():
+    from main.utilities.RAG import embedding_model_name
+    return embedding_model_name
+
+
+embedding_service = CachedEmbeddingService(
+    EmbeddingBatcher(
+        _get_encoder,
+        max_batch_size=embedding_batch_max_size,
+        max_wait_ms=embedding_batch_wait_ms,
+        num_workers=embedding_service_workers,
+    ),
+    QueryEmbeddingCache(_get_model_name(), maxsize=query_embedding_cache_size, cache_dir=query_embedding_cache_dir),
+)
+register_stats("query_embedding_cache", embedding_service.cache.stats)
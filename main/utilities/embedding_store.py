@@ -0,0 +1,212 @@
+"""
+Memory-mapped sidecar embedding store kept next to each collection's chroma.sqlite3.
+
+Layout of <collection loc>/embedding_store/:
+    vectors.bin   raw row-major matrix of L2-normalized embeddings (float16 or float32)
+    ids.txt       chunk id table, one id per line - line number is the row offset in vectors.bin
+    meta.json     {"dim": ..., "dtype": ...}
+
+Readers np.memmap vectors.bin, so the pages are shared by every worker process through the OS page cache.
+Writers only append rows for chunks that are not in the store yet.
+"""
+import os
+import json
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+STORE_DIR_NAME = "embedding_store"
+SCORING_BLOCK_ROWS = 65536  # rows converted to float32 at a time while scoring
+
+
+class EmbeddingStore:
+    def __init__(self, loc, dtype: str = "float16"):
+        self.loc = os.path.abspath(str(loc))
+        self.dir = os.path.join(self.loc, STORE_DIR_NAME)
+        self.vectors_path = os.path.join(self.dir, "vectors.bin")
+        self.ids_path = os.path.join(self.dir, "ids.txt")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.lock_path = os.path.join(self.dir, ".lock")
+        self.dtype = np.dtype(dtype)
+        self._mapped = None  # (signature, ids, memmap)
+        self._lock = threading.Lock()
+
+    # ---------- reading ----------
+
+    def _signature(self):
+        try:
+            ids_stat = os.stat(self.ids_path)
+            vec_stat = os.stat(self.vectors_path)
+        except FileNotFoundError:
+            return None
+        return (ids_stat.st_size, ids_stat.st_mtime_ns, vec_stat.st_size)
+
+    def _read_meta(self):
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def open(self) -> Tuple[List[str], Optional[np.memmap]]:
+        """Return (ids, memmap matrix); the mapping is reused until the files change on disk."""
+        with self._lock:
+            signature = self._signature()
+            if signature is None:
+                return [], None
+            if self._mapped is not None and self._mapped[0] == signature:
+                return self._mapped[1], self._mapped[2]
+
+            meta = self._read_meta()
+            dim, dtype = int(meta["dim"]), np.dtype(meta["dtype"])
+            with open(self.ids_path, "r", encoding="utf-8") as f:
+                ids = f.read().splitlines()
+            # Rows are written before ids, so a partially appended row is never referenced
+            n_rows = min(len(ids), signature[2] // (dim * dtype.itemsize))
+            ids = ids[:n_rows]
+            matrix = np.memmap(self.vectors_path, dtype=dtype, mode="r", shape=(n_rows, dim)) if n_rows else None
+            self._mapped = (signature, ids, matrix)
+            return ids, matrix
+
+    def __len__(self):
+        return len(self.open()[0])
+
+    def scores(self, query_emb) -> np.ndarray:
+        """Cosine similarities of all stored chunks, computed block by block straight from the mapping."""
+        ids, matrix = self.open()
+        if matrix is None:
+            return np.empty(0, dtype=np.float32)
+        query_emb = np.asarray(query_emb, dtype=np.float32).reshape(-1)
+        query_emb = query_emb / (np.linalg.norm(query_emb) or 1.0)
+        out = np.empty(len(ids), dtype=np.float32)
+        for start in range(0, len(ids), SCORING_BLOCK_ROWS):
+            block = matrix[start:start + SCORING_BLOCK_ROWS]
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
+            out[start:start + len(block)] = block @ query_emb
+        return out
+
+    # ---------- writing ----------
+
+    def _acquire_file_lock(self):
+        handle = open(self.lock_path, "a+")
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    @staticmethod
+    def _release_file_lock(handle):
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    def _clear(self):
+        for path in (self.vectors_path, self.ids_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _repair(self):
+        """
+        Bring the files back to a consistent state before appending (caller holds the file lock):
+        rows without an id (or ids without a row) left by an interrupted sync are cut off, and a store
+        written with another dtype is dropped so it gets rebuilt.
+        """
+        try:
+            meta = self._read_meta()
+            dim, dtype = int(meta["dim"]), np.dtype(meta["dtype"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            self._clear()
+            return
+        if dtype != self.dtype:
+            print(f"Embedding store {self.dir}: dtype changed ({dtype.name} -> {self.dtype.name}), rebuilding")
+            self._clear()
+            return
+        try:
+            with open(self.ids_path, "r", encoding="utf-8") as f:
+                ids = f.read().splitlines()
+        except FileNotFoundError:
+            ids = []
+        row_bytes = dim * dtype.itemsize
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        n_rows = min(len(ids), size // row_bytes)
+        if size != n_rows * row_bytes:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(n_rows * row_bytes)
+        if len(ids) != n_rows:
+            with open(self.ids_path, "w", encoding="utf-8") as f:
+                f.write("".join(f"{chunk_id}\n" for chunk_id in ids[:n_rows]))
+
+    def _stored_dim(self):
+        try:
+            return int(self._read_meta()["dim"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_meta(self, dim):
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": int(dim), "dtype": self.dtype.name}, f)
+
+    def sync(self, collection, batch_size: int = 1000) -> int:
+        """
+        Append the embeddings of chunks that are in the Chroma collection but not in the store yet.
+        The store is rebuilt from scratch if it holds ids that no longer exist in the collection,
+        or if it was written with another dtype or embedding dimension.
+        Returns the number of appended rows.
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        lock_handle = self._acquire_file_lock()
+        try:
+            self._repair()
+            collection_ids = collection.get(include=[])["ids"]
+            stored_ids, _ = self.open()
+            stored_set = set(stored_ids)
+            if stored_ids and not stored_set.issubset(collection_ids):
+                self._clear()
+                stored_ids, stored_set = [], set()
+            missing = [chunk_id for chunk_id in collection_ids if chunk_id not in stored_set]
+            if stored_ids and collection_ids:
+                # Embeddings of another size (embedding model changed): rebuild instead of appending
+                probe = np.asarray(collection.get(ids=(missing or collection_ids)[:1], include=["embeddings"])["embeddings"])
+                if probe.ndim == 2 and len(probe) and probe.shape[1] != self._stored_dim():
+                    self._clear()
+                    stored_ids, missing = [], list(collection_ids)
+
+            appended = 0
+            for start in range(0, len(missing), batch_size):
+                batch = collection.get(ids=missing[start:start + batch_size], include=["embeddings"])
+                embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+                if len(embeddings) == 0:
+                    continue
+                if not stored_ids and appended == 0:
+                    self._clear()
+                    self._write_meta(embeddings.shape[1])
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                rows = np.ascontiguousarray(embeddings / norms, dtype=self.dtype)
+                with open(self.vectors_path, "ab") as f:
+                    f.write(rows.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                with open(self.ids_path, "a", encoding="utf-8") as f:
+                    f.write("".join(f"{chunk_id}\n" for chunk_id in batch["ids"]))
+                appended += len(rows)
+            return appended
+        finally:
+            self._release_file_lock(lock_handle)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_embedding_store(loc, dtype: str = "float16") -> EmbeddingStore:
+    """Process-wide EmbeddingStore per collection directory, so the memmap is opened once per worker."""
+    key = os.path.abspath(str(loc))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = EmbeddingStore(key, dtype=dtype)
+        return store
@@ -0,0 +1,54 @@
+"""
+Shared sentence-transformer encoder and the adapters that expose it to LlamaIndex/LangChain and Chroma.
+All adapters wrap the same SharedEncoder, so the model weights are loaded once per process.
+"""
+import threading
+from typing import List
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from langchain_core.embeddings import Embeddings
+from chromadb.api.types import Documents, EmbeddingFunction
+
+
+class SharedEncoder:
+    """One SentenceTransformer instance shared by every embedding adapter of the process."""
+
+    def __init__(self, model_name: str, **model_kwargs):
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, **model_kwargs)
+        # SentenceTransformer.encode is not guaranteed to be thread-safe
+        self._lock = threading.Lock()
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        with self._lock:
+            return self.model.encode(texts, **kwargs)
+
+    def __getattr__(self, name):
+        # Expose the rest of the SentenceTransformer API (e.g. get_sentence_embedding_dimension)
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+class LangchainEncoderAdapter(Embeddings):
+    """LangChain Embeddings over the shared encoder (mirrors HuggingFaceEmbeddings defaults)."""
+
+    def __init__(self, encoder: SharedEncoder):
+        self.encoder = encoder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = [text.replace("\n", " ") for text in texts]
+        return self.encoder.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class ChromaEncoderAdapter(EmbeddingFunction[Documents]):
+    """Chroma embedding function over the shared encoder (mirrors SentenceTransformerEmbeddingFunction defaults)."""
+
+    def __init__(self, encoder: SharedEncoder):
+        self.encoder = encoder
+
+    def __call__(self, input: Documents):
+        return [np.asarray(emb, dtype=np.float32) for emb in self.encoder.encode(list(input))]
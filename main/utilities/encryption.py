@@ -7,14 +7,54 @@ import base64
 from Cryptodome.PublicKey import RSA
 from Cryptodome.Cipher import PKCS1_v1_5
 from base64 import b64decode
+import os
+import time
+import threading
+
+
+class RSAKeyManager:
+    """
+    Parses each RSA key file once and caches its PKCS1_v1_5 cipher.
+    The file is stat-ed at most every check_interval seconds and re-parsed only when it changed on disk.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self._entries = {}  # absolute key path -> (file signature, last check time, cipher)
+        self._lock = threading.Lock()
+
+    def cipher(self, key_path: str):
+        path = os.path.abspath(key_path)
+        now = time.monotonic()
+        entry = self._entries.get(path)
+        if entry is not None and now - entry[1] < self.check_interval:
+            return entry[2]
+        with self._lock:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                cipher = entry[2]
+            else:
+                with open(path, 'rb') as f:
+                    cipher = PKCS1_v1_5.new(RSA.import_key(f.read()))
+            self._entries[path] = (signature, now, cipher)
+            return cipher
+
+    def invalidate(self, key_path: str = None):
+        """Force a re-read of one key file (or all of them) on next use."""
+        with self._lock:
+            if key_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(key_path), None)
+
+
+rsa_key_manager = RSAKeyManager()
 
 
 def decode_chuncks(encrypted_chunks, lang, chunkded=False):
-    with open('private_key.pem', 'rb') as f:
-        private_key_data = f.read()
-    private_key = RSA.import_key(private_key_data)
-    # print(f"\private_key: {private_key}\n")
-    cipher = PKCS1_v1_5.new(private_key)
+    cipher = rsa_key_manager.cipher('private_key.pem')
 
     if chunkded == False:
         encrypted_chuncks = [encrypted_chunks]
@@ -40,11 +80,7 @@ def encrypt3(raw, encrypted_aes_key):
 
 
 def encrypt_and_chunck(text, lang):
-    with open('public_key.pem', 'rb') as f:
-        public_key_data = f.read()
-    public_key = RSA.import_key(public_key_data)
-    # print(f"\public_key: {public_key}\n")
-    cipher = PKCS1_v1_5.new(public_key)
+    cipher = rsa_key_manager.cipher('public_key.pem')
 
     if lang == "Persian":
         text = text.encode('utf-8')
@@ -60,10 +96,7 @@ def encrypt_and_chunck(text, lang):
 def decode_RSA(encrypted_text, private_key_path:str='private_key.pem'):
     if encrypted_text is None or encrypted_text == '':
         raise ValueError("encrypted_text cannot be None or empty")
-    with open(private_key_path, 'rb') as f:
-        private_key_data = f.read()
-    private_key = RSA.import_key(private_key_data)
-    cipher = PKCS1_v1_5.new(private_key)
+    cipher = rsa_key_manager.cipher(private_key_path)
     decrypted_bytes = base64.b64decode(encrypted_text)
     decrypted_text = cipher.decrypt(decrypted_bytes, None).decode('utf-8')
     return decrypted_text
@@ -133,4 +166,13 @@ def encrypt_AES_ECB(plain_text, aes_key):
     encrypted_text = base64.b64encode(encrypted_text)
     
     # Returning the encrypted data and the IV so that decryption can occur
-    return encrypted_text # Prepend the IV to the encrypted data for use in decryption
\ No newline at end of file
+    return encrypted_text # Prepend the IV to the encrypted data for use in decryption
+
+
+def encrypt_AES_ECB_bulk(plain_texts, aes_key):
+    """encrypt_AES_ECB for many texts with a single cipher object; returns base64 strings."""
+    if isinstance(aes_key, str):
+        aes_key = base64.b64decode(aes_key.encode('utf-8'))
+    cipher = AES.new(aes_key, AES.MODE_ECB)
+    return [base64.b64encode(cipher.encrypt(pad(text.encode('utf-8'), AES.block_size))).decode('utf-8')
+            for text in plain_texts]
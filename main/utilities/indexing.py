@@ -0,0 +1,358 @@
+"""
+Background document indexing - uploads are queued as IndexingJob rows by the views and
+processed by `manage.py run_indexing_worker`, outside of the HTTP request.
+
+Jobs are resumable: files are processed one by one and their status is stored as they finish,
+so a job that was interrupted (worker crash/restart) is requeued and continues with its unfinished files.
+"""
+import os
+import sys
+import socket
+import logging
+import threading
+import traceback
+from collections import namedtuple
+from contextlib import ExitStack
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction, connection
+from django.db.models import Q
+from django.utils import timezone
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
+from main.models import Document, IndexingJob, IndexingJobFile, Collection
+from main.utilities.helper_functions import hash_file
+from main.utilities.retrieval import refresh_collection_caches
+from main.utilities.ingestion import open_chroma_collection, ingest_file
+from main.utilities.chunk_cache import get_chunk_cache
+from main.utilities.variables import (document_load_timeout, document_loader_processes, indexing_job_stale_after,
+                                      indexing_worker_missing_after, indexing_status_recent_seconds)
+from main.utilities.document_loader import TimeoutException, get_loader_pool
+
+
+# Configure logging for indexing (not AJAX spam)
+indexing_logger = logging.getLogger('indexing')
+indexing_logger.setLevel(logging.INFO)
+if not indexing_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('\n[INDEXING] %(message)s'))
+    indexing_logger.addHandler(handler)
+
+all_docs_collection_name = "ALL_DOCS_COLLECTION"
+all_docs_collection_path = os.path.join(settings.BASE_DIR, "collections", all_docs_collection_name)
+
+# Disable signal alarm in LlamaIndex - it doesn't work in Django threads on Linux
+if sys.platform.startswith('linux'):
+    try:
+        # Monkey-patch signal to prevent LlamaIndex from using it in threads
+        import signal as _signal_module
+        _original_signal = _signal_module.signal
+        _original_alarm = _signal_module.alarm
+        
+        def _patched_signal(signalnum, handler):
+            import threading
+            if threading.current_thread() is threading.main_thread():
+                return _original_signal(signalnum, handler)
+            return None
+        
+        def _patched_alarm(time):
+            import threading
+            if threading.current_thread() is threading.main_thread():
+                return _original_alarm(time)
+            return 0
+        
+        _signal_module.signal = _patched_signal
+        _signal_module.alarm = _patched_alarm
+        indexing_logger.info("✓ Signal module patched for Linux")
+    except Exception as e:
+        indexing_logger.warning(f"Could not patch signal module: {e}")
+
+def load_document_with_timeout(file_path, timeout_seconds=60):
+    """
+    Load a document in the persistent loader process pool.
+    Raises TimeoutException (the stuck loader process is killed and replaced) if parsing takes longer than timeout_seconds.
+    """
+    file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
+    ext = os.path.splitext(file_path)[1].lower()
+    indexing_logger.info(f"📄 File: {os.path.basename(file_path)} ({file_size:.2f} MB, {ext})")
+    return get_loader_pool(document_loader_processes).load(file_path, timeout=timeout_seconds)
+
+
+# ---------- enqueueing (web process) ----------
+
+def enqueue_indexing_job(user, uploaded_files, docs_path, target_loc, thread=None, collection=None) -> IndexingJob:
+    """Save the uploaded files under docs_path and queue them for indexing into target_loc."""
+    saved_files = []
+    for file in uploaded_files:
+        doc_path = default_storage.get_available_name(os.path.join(docs_path, file.name))
+        default_storage.save(doc_path, ContentFile(file.read()))
+        saved_files.append((file.name, doc_path))
+    # Job and file rows are committed together, so a worker never claims a job before its files are listed
+    with transaction.atomic():
+        job = IndexingJob.objects.create(user=user, thread=thread, collection=collection, target_loc=target_loc)
+        job_files = [IndexingJobFile(job=job, name=name, loc=doc_path) for name, doc_path in saved_files]
+        IndexingJobFile.objects.bulk_create(job_files)
+    indexing_logger.info(f"Queued indexing job {job.id}: {len(job_files)} files -> {target_loc}")
+    return job
+
+
+def job_progress(job: IndexingJob) -> dict:
+    """Per-file status of a job, in the shape polled by the upload forms (current / total / filename)."""
+    files = list(job.files.order_by('id').values('name', 'status', 'n_chunks', 'error'))
+    for f in files:
+        # Only the message is shown to the user; the traceback stays in the database
+        f['error'] = f['error'].strip().splitlines()[0] if f['error'] else None
+    finished = sum(f['status'] not in (IndexingJobFile.STATUS_PENDING, IndexingJobFile.STATUS_RUNNING) for f in files)
+    running = [f['name'] for f in files if f['status'] == IndexingJobFile.STATUS_RUNNING]
+    waiting_for = (timezone.now() - job.time_created).total_seconds()
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'current': finished + len(running),
+        'total': len(files),
+        'filename': running[0] if running else '',
+        'files': files,
+        # Still pending long after upload: most likely no `manage.py run_indexing_worker` is running
+        'worker_missing': job.status == IndexingJob.STATUS_PENDING and waiting_for > indexing_worker_missing_after,
+    }
+
+
+def target_jobs_progress(thread=None, collection=None) -> list:
+    """Progress of the active jobs of a thread or collection, plus the ones that finished in the last few minutes."""
+    jobs = IndexingJob.objects.filter(thread=thread) if thread is not None else IndexingJob.objects.filter(collection=collection)
+    recent = timezone.now() - timedelta(seconds=indexing_status_recent_seconds)
+    jobs = jobs.filter(Q(status__in=[IndexingJob.STATUS_PENDING, IndexingJob.STATUS_RUNNING]) | Q(time_finished__gte=recent))
+    return [job_progress(job) for job in jobs.order_by('id')]
+
+
+# ---------- processing (worker process) ----------
+
+IndexTarget = namedtuple("IndexTarget", ["chroma_collection", "loc", "collection", "label"])
+
+_loc_locks = {}
+_loc_locks_lock = threading.Lock()
+
+
+def _loc_lock(loc) -> threading.Lock:
+    """Per-Chroma-directory lock, so concurrent jobs of one worker never write to the same collection at once."""
+    key = os.path.abspath(str(loc))
+    with _loc_locks_lock:
+        return _loc_locks.setdefault(key, threading.Lock())
+
+
+def _discard_partial_document(job_file: IndexingJobFile, chroma_collections):
+    """Remove the Document and the chunks a previous, interrupted attempt left behind for this file."""
+    doc_obj = job_file.document
+    if doc_obj is None:
+        return
+    # Chunk ids written by the ingestion pipeline are "{doc_id}_{idx}_{n}", so ids alone identify the document
+    prefix = f"{doc_obj.id}_"
+    for chroma_collection in chroma_collections:
+        stale_ids = [chunk_id for chunk_id in chroma_collection.get(include=[])["ids"] if chunk_id.startswith(prefix)]
+        if stale_ids:
+            chroma_collection.delete(ids=stale_ids)
+    job_file.document = None
+    job_file.save(update_fields=["document"])
+    doc_obj.delete()
+
+
+def _index_file(job: IndexingJob, job_file: IndexingJobFile, targets, sha256=None, load=None):
+    """
+    Load one file and upsert its chunks into every target: the job's own collection, plus ALL_DOCS for collections.
+    Files whose content was indexed before are copied from the chunk cache without loading or encoding them.
+    `load` is an optional Future of the file's documents, already submitted to the loader pool.
+    Returns the number of chunks.
+    """
+    sha256 = sha256 or hash_file(job_file.loc)["sha256"]
+    chunk_cache = get_chunk_cache()
+    if chunk_cache is not None and chunk_cache.contains(sha256):
+        indexing_logger.info(f"   Reusing cached chunks (sha256 {sha256[:12]}...)")
+    else:
+        if load is None:
+            load = get_loader_pool(document_loader_processes).submit(job_file.loc, document_load_timeout)
+        load.result()  # parse before the Document row exists and outside the target locks
+    load_documents = load.result if load is not None else (
+        lambda: load_document_with_timeout(job_file.loc, timeout_seconds=document_load_timeout))
+
+    doc_obj = Document.objects.create(user=job.user, name=job_file.name, public=False,
+                                      description=None, loc=job_file.loc, sha256=sha256)
+    job_file.document = doc_obj
+    job_file.save(update_fields=["document"])
+
+    with ExitStack() as stack:
+        for target in targets:
+            stack.enter_context(_loc_lock(target.loc))
+        write_targets = []
+        for position, target in enumerate(targets):
+            # A file already in ALL_DOCS (same sha256) is only added to the job's own target
+            if position > 0 and target.collection.docs.filter(sha256=doc_obj.sha256).exists():
+                indexing_logger.info(f"   Document already in {target.label}, skipping it there")
+                continue
+            write_targets.append(target)
+        # Each chunk is embedded once; the same vectors are upserted into every target
+        indexing_logger.info(f"   Upserting chunks into {', '.join(t.label for t in write_targets)}...")
+        n_chunks = ingest_file([target.chroma_collection for target in write_targets], doc_obj.id, sha256, load_documents)
+        for target in write_targets:
+            if target.collection is not None:
+                target.collection.docs.add(doc_obj)
+    if job.thread is not None:
+        job.thread.docs.add(doc_obj)
+    return n_chunks
+
+
+def _build_targets(job: IndexingJob):
+    from main.utilities.RAG import create_all_docs_collection
+    if job.collection is None:
+        return [IndexTarget(open_chroma_collection(job.target_loc), job.target_loc, None, "THREAD")]
+    create_all_docs_collection()
+    all_docs_collection = Collection.objects.get(name=all_docs_collection_name)
+    return [IndexTarget(open_chroma_collection(job.target_loc), job.target_loc, job.collection, "COLLECTION"),
+            IndexTarget(open_chroma_collection(all_docs_collection_path), all_docs_collection_path, all_docs_collection, "ALL_DOCS")]
+
+
+class JobOwnershipLost(Exception):
+    """The job was requeued (stale heartbeat) and may now be run by another worker."""
+
+
+class JobHeartbeat(threading.Thread):
+    """
+    Refreshes the heartbeat of a running job every `interval` seconds, so requeue_stale_jobs() never takes it over
+    while one long file (load + embedding + upsert) is being processed.
+    """
+
+    def __init__(self, job: IndexingJob, interval: float):
+        super().__init__(name=f"indexing-heartbeat-{job.id}", daemon=True)
+        self.job_id = job.id
+        self.worker = job.worker
+        self.interval = interval
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def beat(self) -> bool:
+        """Update the heartbeat; False (and lost=True) if the job is no longer running under this worker."""
+        owned = IndexingJob.objects.filter(id=self.job_id, worker=self.worker, status=IndexingJob.STATUS_RUNNING).update(
+            heartbeat=timezone.now()) > 0
+        if not owned:
+            self.lost = True
+        return owned
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.interval):
+                try:
+                    if not self.beat():
+                        indexing_logger.warning(f"Job {self.job_id} was requeued - this worker no longer owns it")
+                        return
+                except Exception as e:
+                    indexing_logger.error(f"Heartbeat of job {self.job_id} failed: {e}")
+        finally:
+            connection.close()  # this thread's own DB connection
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def process_job(job: IndexingJob, heartbeat: JobHeartbeat = None):
+    """Index the unfinished files of a claimed job, recording the status of each file as it completes."""
+    targets = _build_targets(job)
+    pending_files = list(job.files.filter(status__in=[IndexingJobFile.STATUS_PENDING, IndexingJobFile.STATUS_RUNNING]).order_by('id'))
+    total_files = job.files.count()
+    indexing_logger.info(f"\n{'='*60}\nJob {job.id}: indexing {len(pending_files)}/{total_files} files\n{'='*60}")
+
+    loader_pool = get_loader_pool(document_loader_processes)
+    chunk_cache = get_chunk_cache()
+    hashes, loads = {}, {}
+
+    def prefetch(start):
+        # Parse the next files in the loader pool while the current one is embedded and written
+        for upcoming in pending_files[start:start + loader_pool.size]:
+            if upcoming.id in hashes:
+                continue
+            try:
+                hashes[upcoming.id] = hash_file(upcoming.loc)["sha256"]
+            except OSError:
+                continue  # reported by _index_file when the file's turn comes
+            if chunk_cache is None or not chunk_cache.contains(hashes[upcoming.id]):
+                loads[upcoming.id] = loader_pool.submit(upcoming.loc, document_load_timeout)
+
+    for position, job_file in enumerate(pending_files):
+        prefetch(position)
+        if job_file.status == IndexingJobFile.STATUS_RUNNING:
+            # Interrupted by a crash: start this file over
+            _discard_partial_document(job_file, [target.chroma_collection for target in targets])
+        job_file.status = IndexingJobFile.STATUS_RUNNING
+        job_file.save(update_fields=["status"])
+        if heartbeat is not None and (heartbeat.lost or not heartbeat.beat()):
+            raise JobOwnershipLost(f"Job {job.id} was requeued while running")
+
+        indexing_logger.info(f"Processing file: {job_file.name}")
+        try:
+            job_file.n_chunks = _index_file(job, job_file, targets, hashes.get(job_file.id), loads.pop(job_file.id, None))
+            job_file.status = IndexingJobFile.STATUS_DONE
+            indexing_logger.info(f"✓ COMPLETED: {job_file.name}")
+        except TimeoutException as e:
+            job_file.status, job_file.error = IndexingJobFile.STATUS_SKIPPED, str(e)
+            indexing_logger.warning(f"⚠ SKIPPED (timeout): {job_file.name}")
+        except Exception as e:
+            job_file.status, job_file.error = IndexingJobFile.STATUS_FAILED, f"{e}\n{traceback.format_exc()}"
+            indexing_logger.error(f"✗ INDEXING FAILED for {job_file.name}: {e}")
+            _discard_partial_document(job_file, [target.chroma_collection for target in targets])
+            # Delete the file if indexing failed
+            if os.path.exists(job_file.loc):
+                os.remove(job_file.loc)
+        job_file.time_finished = timezone.now()
+        job_file.save(update_fields=["status", "error", "n_chunks", "time_finished"])
+
+    # Refresh retrieval caches so the next chat turn sees the new chunks
+    for target in targets:
+        refresh_collection_caches(target.loc, target.chroma_collection)
+    indexing_logger.info(f"\n{'='*60}\n✓ JOB {job.id} COMPLETED\n{'='*60}\n")
+
+
+def claim_next_job(worker_name: str):
+    """Atomically take the oldest pending job (safe with several workers/processes)."""
+    with transaction.atomic():
+        job = (IndexingJob.objects.select_for_update(skip_locked=True)
+               .filter(status=IndexingJob.STATUS_PENDING).order_by('id').first())
+        if job is None:
+            return None
+        now = timezone.now()
+        job.status, job.worker, job.time_started, job.heartbeat = IndexingJob.STATUS_RUNNING, worker_name, now, now
+        job.save(update_fields=["status", "worker", "time_started", "heartbeat"])
+        return job
+
+
+def requeue_stale_jobs(stale_after: int) -> int:
+    """Put running jobs whose worker stopped sending heartbeats (crash, restart) back in the queue."""
+    deadline = timezone.now() - timedelta(seconds=stale_after)
+    requeued = IndexingJob.objects.filter(status=IndexingJob.STATUS_RUNNING, heartbeat__lt=deadline).update(
+        status=IndexingJob.STATUS_PENDING, worker=None)
+    if requeued:
+        indexing_logger.warning(f"Requeued {requeued} stale indexing job(s)")
+    return requeued
+
+
+def run_job(job: IndexingJob, heartbeat_interval: float = None):
+    heartbeat = JobHeartbeat(job, heartbeat_interval or max(indexing_job_stale_after / 3, 1))
+    heartbeat.start()
+    try:
+        process_job(job, heartbeat)
+        status, error = IndexingJob.STATUS_DONE, None
+    except JobOwnershipLost as e:
+        indexing_logger.warning(f"⚠ JOB {job.id} ABANDONED: {e}")
+        return
+    except Exception as e:
+        status, error = IndexingJob.STATUS_FAILED, f"{e}\n{traceback.format_exc()}"
+        indexing_logger.error(f"✗ JOB {job.id} FAILED: {e}")
+    finally:
+        heartbeat.stop()
+    # Only the worker that still owns the job records its outcome
+    finished = IndexingJob.objects.filter(id=job.id, worker=job.worker, status=IndexingJob.STATUS_RUNNING).update(
+        status=status, error=error, time_finished=timezone.now())
+    if not finished:
+        indexing_logger.warning(f"⚠ JOB {job.id} was requeued while running - result of this run not recorded")
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
@@ -0,0 +1,106 @@
+"""
+Batched document ingestion - chunks are embedded in large batches with the shared encoder and written
+with one Chroma upsert per batch, instead of one index.insert() (embed + write) per chunk.
+
+Chunks are stored in the layout of LlamaIndex's ChromaVectorStore (same metadata, ref_doc_id included),
+so retrieval and the chunk lookups by document keep working on collections built either way.
+"""
+import os
+import numpy as np
+import chromadb
+from main.utilities.variables import INDEXING_CHUNK_SIZE, INDEXING_CHUNK_OVERLAP, ingestion_batch_size, ingestion_encode_batch_size
+
+
+def open_chroma_collection(loc):
+    """The "default" Chroma collection of a vector DB directory (created if missing)."""
+    os.makedirs(loc, exist_ok=True)
+    return chromadb.PersistentClient(path=str(loc)).get_or_create_collection("default")
+
+
+def split_documents(doc_id, documents) -> list:
+    """
+    Split loaded documents into chunk nodes, like index.insert() does with the global chunk settings.
+    Node ids are deterministic ("{doc_id}_{idx}_{n}"), so upserting a document again overwrites its chunks.
+    """
+    from llama_index.core import Document as llama_index_doc
+    from llama_index.core.node_parser import SentenceSplitter
+
+    splitter = SentenceSplitter(chunk_size=INDEXING_CHUNK_SIZE, chunk_overlap=INDEXING_CHUNK_OVERLAP)
+    nodes = []
+    for idx, loaded_doc in enumerate(documents):
+        source = llama_index_doc(text=loaded_doc.text, id_=f"{doc_id}_{idx}")
+        for n, node in enumerate(splitter.get_nodes_from_documents([source])):
+            node.id_ = f"{source.id_}_{n}"
+            nodes.append(node)
+    return nodes
+
+
+def embed_texts(texts) -> np.ndarray:
+    """Encode chunk texts in one batched call of the shared encoder."""
+    from main.utilities.RAG import get_embedding_encoder
+    # Same preprocessing as the LangChain adapter used by index.insert(), so vectors match existing chunks
+    texts = [text.replace("\n", " ") for text in texts]
+    return np.asarray(get_embedding_encoder().encode(texts, batch_size=ingestion_encode_batch_size), dtype=np.float32)
+
+
+def upsert_nodes(chroma_collection, nodes, embeddings):
+    """Write a batch of embedded nodes with a single Chroma upsert."""
+    from llama_index.core.schema import MetadataMode
+    from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+    chroma_collection.upsert(
+        ids=[node.node_id for node in nodes],
+        embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+        documents=[node.get_content(metadata_mode=MetadataMode.NONE) or "" for node in nodes],
+        metadatas=[node_to_metadata_dict(node, remove_text=True, flat_metadata=True) for node in nodes],
+    )
+
+
+def ingest_nodes(chroma_collections, nodes, batch_size: int = ingestion_batch_size) -> np.ndarray:
+    """
+    Embed and upsert nodes batch by batch; returns the (n_chunks, dim) embedding matrix.
+    chroma_collections is one collection or a list of them: each batch is embedded once and the same
+    vectors are written to every collection (e.g. a collection and ALL_DOCS_COLLECTION).
+    """
+    from llama_index.core.schema import MetadataMode
+
+    if not isinstance(chroma_collections, (list, tuple)):
+        chroma_collections = [chroma_collections]
+    batches = []
+    for start in range(0, len(nodes), batch_size):
+        batch = nodes[start:start + batch_size]
+        embeddings = embed_texts([node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch])
+        for chroma_collection in chroma_collections:
+            upsert_nodes(chroma_collection, batch, embeddings)
+        batches.append(embeddings)
+    return np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+
+
+def write_embedded_nodes(chroma_collections, nodes, embeddings, batch_size: int = ingestion_batch_size) -> int:
+    """Upsert nodes whose embeddings are already known (e.g. from the chunk cache), without running the encoder."""
+    if not isinstance(chroma_collections, (list, tuple)):
+        chroma_collections = [chroma_collections]
+    for start in range(0, len(nodes), batch_size):
+        for chroma_collection in chroma_collections:
+            upsert_nodes(chroma_collection, nodes[start:start + batch_size], embeddings[start:start + batch_size])
+    return len(nodes)
+
+
+def ingest_file(chroma_collections, doc_id, sha256, load_documents) -> int:
+    """
+    Index one file into the given collections; returns the number of chunks.
+    A file whose content (sha256) was indexed before with the same chunking and embedding model is copied
+    from the chunk cache; otherwise load_documents() is called (e.g. the .result of a loader pool Future)
+    and the chunks are split, embedded and cached.
+    """
+    from main.utilities.chunk_cache import get_chunk_cache
+
+    chunk_cache = get_chunk_cache()
+    cached = chunk_cache.get(sha256) if chunk_cache is not None else None
+    if cached is not None:
+        return write_embedded_nodes(chroma_collections, cached.nodes(doc_id), cached.embeddings)
+    nodes = split_documents(doc_id, load_documents())
+    embeddings = ingest_nodes(chroma_collections, nodes)
+    if chunk_cache is not None:
+        chunk_cache.set(sha256, nodes, embeddings)
+    return len(nodes)
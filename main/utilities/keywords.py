@@ -0,0 +1,79 @@
+"""
+Keyword extraction helpers: result cache for the LLM keyword extractor and a cheap local extractor
+for queries that are already short and keyword-like (English and Persian stopword filtering).
+"""
+import unicodedata
+from typing import Optional
+from main.utilities.caching import LRUCache
+from main.utilities.metrics import register_stats
+from main.utilities.variables import keyword_cache_size, keyword_cache_ttl, keyword_local_max_words
+
+
+STOPWORDS_EN = {
+    "a", "an", "the", "and", "or", "but", "of", "in", "on", "at", "to", "for", "from", "by", "with", "about",
+    "as", "into", "is", "are", "was", "were", "be", "been", "being", "do", "does", "did", "can", "could",
+    "would", "should", "will", "shall", "may", "might", "must", "what", "which", "who", "whom", "whose",
+    "when", "where", "why", "how", "this", "that", "these", "those", "it", "its", "i", "me", "my", "we",
+    "our", "you", "your", "he", "she", "they", "them", "their", "please", "tell", "explain", "describe",
+    "define", "definition", "show", "give", "list", "briefly", "brief", "some", "any", "all", "more",
+    "most", "there", "here", "than", "then", "so", "if", "not", "no", "yes", "hi", "hello", "hey",
+}
+
+STOPWORDS_FA = {
+    "و", "در", "به", "از", "که", "این", "آن", "را", "با", "است", "هست", "بود", "برای", "یک", "تا", "هم",
+    "چی", "چه", "چیست", "چیه", "کدام", "کدوم", "آیا", "چگونه", "چطور", "چرا", "کجا", "کی", "بگو", "بگید",
+    "ببینم", "لطفا", "لطفاً", "توضیح", "بده", "بدهید", "درباره", "مورد", "سلام", "می", "ها", "های", "ای",
+    "من", "ما", "تو", "شما", "او", "آنها", "اون", "این‌ها", "یا", "اما", "ولی", "اگر", "نیز", "شود", "کن",
+}
+
+# Sentence punctuation stripped around a word; symbols that are part of terms ("C++", "C#", ".NET") are kept
+_LEADING_PUNCTUATION = "\"'`([{<«"
+_TRAILING_PUNCTUATION = ".,;:!?؟،؛\"'`)]}>»"
+
+
+def normalize_query(text: str) -> str:
+    """Cache-key form of a query: NFKC, case-folded, whitespace runs collapsed (symbols are significant)."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def _query_words(text: str):
+    words = (word.lstrip(_LEADING_PUNCTUATION).rstrip(_TRAILING_PUNCTUATION) for word in unicodedata.normalize("NFKC", text).split())
+    return [word for word in words if word]
+
+
+def local_keywords(text: str, max_words: int = 4) -> Optional[str]:
+    """
+    Extract keywords without the LLM when the query is already short and keyword-like.
+    Returns None when the query has more than max_words words or nothing is left after stopword filtering.
+    """
+    words = _query_words(text)
+    if not words or len(words) > max_words:
+        return None
+    keywords = [w for w in words if w.casefold() not in STOPWORDS_EN and w not in STOPWORDS_FA and not w.isdigit()]
+    if not keywords:
+        return None
+    return " ".join(keywords)
+
+
+class KeywordCache:
+    """TTL/LRU cache of normalized query text -> extracted keywords, with counters for monitoring."""
+
+    def __init__(self, maxsize: int = 2048, ttl: Optional[float] = 3600):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.local_extractions = 0
+        self.llm_extractions = 0
+
+    def get(self, text: str) -> Optional[str]:
+        return self._cache.get(normalize_query(text))
+
+    def set(self, text: str, keywords: str):
+        self._cache.set(normalize_query(text), keywords)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats.update({"ttl": self._cache.ttl, "local_extractions": self.local_extractions, "llm_extractions": self.llm_extractions})
+        return stats
+
+
+keyword_cache = KeywordCache(maxsize=keyword_cache_size, ttl=keyword_cache_ttl)
+register_stats("keyword_cache", keyword_cache.stats)
@@ -0,0 +1,111 @@
+"""
+Pooled HTTP clients for the OpenAI-compatible LLM server (vLLM).
+Async callers share one aiohttp.ClientSession per event loop; sync callers (e.g. database query generation
+running in an executor) share one requests.Session. Both keep connections alive between requests.
+"""
+import asyncio
+import json
+import threading
+import weakref
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from main.utilities.variables import (llm_connection_limit, llm_connection_limit_per_host, llm_keepalive_timeout,
+                                      llm_connect_timeout, llm_read_timeout)
+
+
+_sessions = weakref.WeakKeyDictionary()  # event loop -> ClientSession
+_sync_session = None
+_sync_session_lock = threading.Lock()
+
+
+def _chat_completions_endpoint(llm_url: str) -> str:
+    return llm_url.rstrip("/") + "/chat/completions"
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the pooled session of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=llm_connection_limit,
+            limit_per_host=llm_connection_limit_per_host,
+            keepalive_timeout=llm_keepalive_timeout,
+        )
+        # sock_read bounds the gap between two streamed chunks, not the whole generation
+        timeout = aiohttp.ClientTimeout(total=None, connect=llm_connect_timeout, sock_read=llm_read_timeout)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers={"Content-Type": "application/json"})
+        _sessions[loop] = session
+    return session
+
+
+def get_sync_session() -> requests.Session:
+    """Return the process-wide requests.Session with a keep-alive connection pool sized like the async one."""
+    global _sync_session
+    with _sync_session_lock:
+        if _sync_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=llm_connection_limit_per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Content-Type": "application/json"})
+            _sync_session = session
+        return _sync_session
+
+
+async def post_chat_completion(llm_url: str, payload: dict, timeout: float = 30) -> dict:
+    """
+    POST a non-streaming chat completion request and return the decoded JSON body.
+    Raises RuntimeError on a non-200 response and asyncio.TimeoutError after `timeout` seconds.
+    """
+    endpoint = _chat_completions_endpoint(llm_url)
+    async with get_session().post(endpoint, json=payload, timeout=aiohttp.ClientTimeout(total=timeout, connect=llm_connect_timeout)) as resp:
+        if resp.status != 200:
+            raise RuntimeError(f"LLM request failed {resp.status}: {await resp.text()}")
+        return await resp.json()
+
+
+async def stream_chat_completion(llm_url: str, payload: dict):
+    """
+    POST a streaming chat completion request and yield the content deltas as they arrive.
+    Raises RuntimeError on a non-200 response; undecodable stream lines are skipped.
+    Closing the generator early (aclose() or task cancellation) aborts the HTTP stream.
+    """
+    endpoint = _chat_completions_endpoint(llm_url)
+    async with get_session().post(endpoint, json=payload) as resp:
+        if resp.status != 200:
+            raise RuntimeError(f"LLM request failed {resp.status}: {await resp.text()}")
+        completed = False
+        try:
+            async for line_bytes in resp.content:
+                line = line_bytes.decode("utf-8").strip()
+                if not line.startswith("data: "):
+                    continue
+                data_str = line[len("data: "):].strip()
+                if data_str == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data_str)["choices"][0]["delta"].get("content", "")
+                except (ValueError, KeyError, IndexError) as e:
+                    print("Error decoding stream chunk:", e)
+                    continue
+                if chunk:
+                    yield chunk
+            completed = True
+        finally:
+            if not completed:
+                # Cancelled or closed early: drop the connection so vLLM aborts the request
+                # instead of generating up to max_tokens for nobody
+                resp.close()
+
+def post_chat_completion_sync(llm_url: str, payload: dict, timeout: float = None) -> requests.Response:
+    """
+    Blocking POST of a chat completion request on the pooled requests.Session; returns the raw response.
+    `timeout` is the read timeout in seconds (defaults to llm_read_timeout).
+    """
+    return get_sync_session().post(
+        _chat_completions_endpoint(llm_url),
+        json=payload,
+        timeout=(llm_connect_timeout, timeout if timeout is not None else llm_read_timeout),
+    )
@@ -0,0 +1,105 @@
+"""
+Background maintenance of the vector DB directories (run by `manage.py maintain_vector_dbs`):
+removes thread directories whose Thread row was deleted and makes sure the all-docs collection exists.
+The result of the last run is written next to the vector DBs, so every process can serve it on /metrics/.
+"""
+import os
+import json
+import time
+import shutil
+from django.conf import settings
+from main.utilities.metrics import register_stats
+
+
+vector_db_path = os.path.join(settings.BASE_DIR, "vector_dbs")
+STATUS_FILE_NAME = ".maintenance_status.json"
+
+
+def _status_path(root=vector_db_path):
+    return os.path.join(root, STATUS_FILE_NAME)
+
+
+def find_orphaned_vdbs(root=vector_db_path, min_age=600):
+    """
+    Thread directories (<root>/<username>/vdb_<thread name>) without a matching Thread row.
+    Directories modified in the last min_age seconds are skipped - their Thread may still be being created.
+    """
+    from django.contrib.auth import get_user_model
+    from main.models import Thread
+
+    if not os.path.isdir(root):
+        return []
+    thread_dirs = {}  # username -> {"vdb_<name>", ...}
+    for username, name in Thread.objects.values_list("user__username", "name"):
+        thread_dirs.setdefault(username, set()).add("vdb_" + name)
+    known_users = set(get_user_model().objects.values_list("username", flat=True))
+
+    now = time.time()
+    orphaned = []
+    for username in os.listdir(root):
+        user_db_path = os.path.join(root, username)
+        if not os.path.isdir(user_db_path) or username not in known_users:
+            continue
+        for vdb in os.listdir(user_db_path):
+            vdb_path = os.path.join(user_db_path, vdb)
+            if vdb in thread_dirs.get(username, ()) or not os.path.isdir(vdb_path):
+                continue
+            if now - os.path.getmtime(vdb_path) < min_age:
+                continue
+            orphaned.append(vdb_path)
+    return orphaned
+
+
+def run_vector_db_maintenance(root=vector_db_path, min_age=600, dry_run=False) -> dict:
+    """One maintenance pass; returns (and records) its stats."""
+    from main.utilities.RAG import create_all_docs_collection
+
+    start_time = time.time()
+    stats = {"started_at": start_time, "orphaned_found": 0, "orphaned_deleted": 0, "delete_errors": 0,
+             "all_docs_collection_ok": False, "dry_run": dry_run}
+    orphaned = find_orphaned_vdbs(root, min_age=min_age)
+    stats["orphaned_found"] = len(orphaned)
+    for vdb_path in orphaned:
+        if dry_run:
+            print(f"Would delete orphaned vector DB: {vdb_path}")
+            continue
+        try:
+            shutil.rmtree(vdb_path)
+            stats["orphaned_deleted"] += 1
+            print(f"Deleted orphaned vector DB: {vdb_path}")
+        except OSError as e:
+            stats["delete_errors"] += 1
+            print(f"Failed to delete orphaned vector DB {vdb_path}: {e}")
+
+    try:
+        # Check whether All docs collection exists in Collection table and filesystem
+        create_all_docs_collection()
+        stats["all_docs_collection_ok"] = True
+    except Exception as e:
+        print(f"All docs collection check failed: {e}")
+
+    stats["duration_s"] = round(time.time() - start_time, 3)
+    _write_status(stats, root)
+    return stats
+
+
+def _write_status(stats, root=vector_db_path):
+    os.makedirs(root, exist_ok=True)
+    tmp_path = _status_path(root) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, _status_path(root))
+
+
+def last_maintenance_status() -> dict:
+    """Stats of the last maintenance run of any process ({} if it never ran)."""
+    try:
+        with open(_status_path(), "r", encoding="utf-8") as f:
+            stats = json.load(f)
+    except FileNotFoundError:
+        return {}
+    stats["seconds_since_last_run"] = round(time.time() - stats.get("started_at", 0), 1)
+    return stats
+
+
+register_stats("vector_db_maintenance", last_maintenance_status)
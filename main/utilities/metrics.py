@@ -0,0 +1,27 @@
+"""
+Process-wide registry of monitoring counters (cache hit/miss rates etc.), served by metrics_view.
+"""
+import threading
+from typing import Callable, Dict
+
+
+_providers: Dict[str, Callable[[], dict]] = {}
+_lock = threading.Lock()
+
+
+def register_stats(name: str, provider: Callable[[], dict]):
+    """Register a zero-argument callable returning a JSON-serializable dict of counters."""
+    with _lock:
+        _providers[name] = provider
+
+
+def collect_stats() -> Dict[str, dict]:
+    with _lock:
+        providers = dict(_providers)
+    stats = {}
+    for name, provider in providers.items():
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return stats
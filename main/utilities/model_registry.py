@@ -0,0 +1,51 @@
+"""
+Lazy model registry - models are registered with a loader and only loaded on first use.
+"""
+import threading
+import time
+import logging
+from typing import Callable, Dict, Iterable, Optional
+
+
+logger = logging.getLogger('main.model_registry')
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders: Dict[str, Callable] = {}
+        self._models: Dict[str, object] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable):
+        """Register a zero-argument loader; nothing is loaded until get(name) is called."""
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str):
+        """Return the model, loading it on first use (concurrent callers wait for the same load)."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                start_time = time.time()
+                model = self._loaders[name]()
+                self._models[name] = model
+                logger.info(f"[ModelRegistry] Loaded '{name}' in {time.time() - start_time:.1f}s")
+        return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: Optional[Iterable[str]] = None):
+        """Load the given models (default: all registered ones) right away."""
+        for name in (names if names is not None else list(self._loaders)):
+            self.get(name)
+
+
+model_registry = ModelRegistry()
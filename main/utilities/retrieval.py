@@ -0,0 +1,265 @@
+"""
+Chunk retrieval for RAG chat - scores the chunks of a thread's Chroma collection against a query embedding
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from typing import List, Optional, Tuple
+from main.utilities.variables import retrieval_mode, ann_candidate_multiplier, embedding_cache_max_mb, embedding_store_dtype
+from main.utilities.embedding_store import get_embedding_store
+
+
+VERSION_FILE_NAME = ".chunks_version"  # per-collection change stamp, shared by the web and indexing worker processes
+
+
+def collection_version(loc) -> str:
+    """Change stamp of a collection directory ("" if it was never bumped)."""
+    try:
+        with open(os.path.join(str(loc), VERSION_FILE_NAME), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def bump_collection_version(loc):
+    """Mark the chunks of a collection directory as changed, for every process that caches them."""
+    path = os.path.join(str(loc), VERSION_FILE_NAME)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"{time.time_ns()}-{os.getpid()}")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not bump collection version of {loc}: {e}")
+
+
+def _cosine_scores(query_emb, chunk_embs):
+    """Cosine similarity between one query vector and a (n, dim) matrix of chunk vectors."""
+    query_emb = np.asarray(query_emb, dtype=np.float32).reshape(-1)
+    chunk_embs = np.asarray(chunk_embs, dtype=np.float32)
+    query_norm = np.linalg.norm(query_emb) or 1.0
+    chunk_norms = np.linalg.norm(chunk_embs, axis=1)
+    chunk_norms[chunk_norms == 0] = 1.0
+    return (chunk_embs @ query_emb) / (chunk_norms * query_norm)
+
+
+def _top_indices(similarities, similarity_cutoff, top_k):
+    """Indices of the top_k chunks above the similarity cutoff, highest similarity first."""
+    similarities = np.asarray(similarities, dtype=np.float32)
+    filtered_indices = np.flatnonzero(similarities >= similarity_cutoff)
+    print(f"\nFiltered {len(similarities) - len(filtered_indices)} chunks below cutoff {similarity_cutoff}")
+    if len(filtered_indices) > top_k:
+        # Partial selection instead of a full sort over the whole collection
+        best = np.argpartition(-similarities[filtered_indices], top_k - 1)[:top_k] if top_k > 0 else []
+        filtered_indices = filtered_indices[best]
+    return sorted(filtered_indices, key=lambda i: similarities[i], reverse=True)
+
+
+def _select_top(ids, texts, similarities, similarity_cutoff, top_k):
+    """Apply the similarity cutoff, then keep the top_k best chunks (highest similarity first)."""
+    sorted_indices = _top_indices(similarities, similarity_cutoff, top_k)
+    return [(ids[i], texts[i], float(similarities[i])) for i in sorted_indices]
+
+
+class CollectionEmbeddings:
+    """Memory-resident copy of one Chroma collection: L2-normalized float32 matrix, chunk ids and texts."""
+
+    def __init__(self, ids, texts, embeddings):
+        self.ids = list(ids)
+        self.texts = list(texts or [])
+        self.version = ""  # collection_version() of the directory when the entry was loaded
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        self.matrix = matrix
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + sum(len(t) for t in self.texts) + sum(len(i) for i in self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, query_emb):
+        """Cosine similarities of all chunks as a single matrix-vector product."""
+        query_emb = np.asarray(query_emb, dtype=np.float32).reshape(-1)
+        query_norm = np.linalg.norm(query_emb) or 1.0
+        return self.matrix @ (query_emb / query_norm)
+
+
+class EmbeddingMatrixCache:
+    """
+    Per-collection cache of CollectionEmbeddings keyed by the collection directory (Thread.loc / Collection.loc).
+    Memory is bounded by max_bytes; the least recently used collections are evicted first.
+    Entries are reloaded when the Chroma count or the collection's version stamp changed; the stamp is bumped by
+    refresh_collection_caches() in whichever process wrote the chunks (the indexing worker), so upserts that
+    replace chunks without changing the count are seen by the web process too.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(loc):
+        return os.path.abspath(str(loc))
+
+    def get(self, loc, collection) -> CollectionEmbeddings:
+        key = self._key(loc)
+        # Read before the data, so a write that races with the load is picked up by the next call
+        version = collection_version(loc)
+        n_chunks = collection.count()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and len(entry) == n_chunks and entry.version == version:
+                self._entries.move_to_end(key)
+                return entry
+
+        results = collection.get(include=["documents", "embeddings"])
+        embeddings = results.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            embeddings = np.empty((0, 0), dtype=np.float32)
+        entry = CollectionEmbeddings(results["ids"], results.get("documents"), embeddings)
+        entry.version = version
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def invalidate(self, loc):
+        with self._lock:
+            self._entries.pop(self._key(loc), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.nbytes
+
+
+embedding_matrix_cache = EmbeddingMatrixCache(max_bytes=embedding_cache_max_mb * 1024 * 1024)
+
+
+def invalidate_embedding_cache(loc):
+    """Drop the cached embedding matrix of a collection directory; call after inserting chunks into it."""
+    embedding_matrix_cache.invalidate(loc)
+
+
+def refresh_collection_caches(loc, collection=None):
+    """
+    Bring the retrieval caches of a collection directory up to date after chunks were inserted:
+    bumps its version stamp (other processes reload their in-memory matrix on their next query), drops this
+    process's matrix and, in "mmap" mode, appends the new chunks to the on-disk sidecar embedding store.
+    """
+    bump_collection_version(loc)
+    invalidate_embedding_cache(loc)
+    if retrieval_mode != "mmap":
+        return
+    try:
+        if collection is None:
+            import chromadb
+            collection = chromadb.PersistentClient(path=str(loc)).get_or_create_collection("default")
+        get_embedding_store(loc, dtype=embedding_store_dtype).sync(collection)
+    except Exception as e:
+        # Not fatal: retrieve_mmap syncs the store lazily when it is behind the collection
+        print(f"Embedding store sync failed for {loc}: {e}")
+
+
+def retrieve_exact(collection, query_emb, similarity_cutoff: float, top_k: int, loc: Optional[str] = None) -> List[Tuple[str, str, float]]:
+    """
+    Brute-force retrieval over every chunk of the collection.
+    With loc given, the normalized embedding matrix is served from the in-process cache.
+    """
+    if loc is None:
+        results = collection.get(include=["documents", "embeddings"])
+        chunk_embs = results.get("embeddings")
+        if chunk_embs is None or len(chunk_embs) == 0:
+            return []
+        similarities = _cosine_scores(query_emb, chunk_embs)
+        return _select_top(results["ids"], results.get("documents", []), similarities, similarity_cutoff, top_k)
+
+    entry = embedding_matrix_cache.get(loc, collection)
+    if len(entry) == 0:
+        return []
+    return _select_top(entry.ids, entry.texts, entry.scores(query_emb), similarity_cutoff, top_k)
+
+
+def retrieve_mmap(collection, query_emb, similarity_cutoff: float, top_k: int, loc: str) -> List[Tuple[str, str, float]]:
+    """
+    Exact retrieval scored zero-copy against the memory-mapped sidecar store of the collection.
+    Only the texts of the selected chunks are read from Chroma.
+    """
+    store = get_embedding_store(loc, dtype=embedding_store_dtype)
+    if len(store) != collection.count():
+        store.sync(collection)
+    ids, _ = store.open()
+    if not ids:
+        return []
+    similarities = store.scores(query_emb)
+    sorted_indices = _top_indices(similarities, similarity_cutoff, top_k)
+    if not sorted_indices:
+        return []
+    top_ids = [ids[i] for i in sorted_indices]
+    fetched = collection.get(ids=top_ids, include=["documents"])
+    texts = dict(zip(fetched["ids"], fetched["documents"]))
+    return [(ids[i], texts.get(ids[i], ""), float(similarities[i])) for i in sorted_indices]
+
+
+def retrieve_ann(collection, query_emb, similarity_cutoff: float, top_k: int) -> List[Tuple[str, str, float]]:
+    """
+    Approximate retrieval through Chroma's HNSW index.
+    The index may use L2 distance on non-normalized vectors, so a few extra candidates are
+    fetched and re-scored by cosine similarity before the cutoff and top_k are applied.
+    """
+    n_chunks = collection.count()
+    if n_chunks == 0:
+        return []
+    n_results = min(n_chunks, max(top_k, 1) * max(ann_candidate_multiplier, 1))
+    query_emb = np.asarray(query_emb, dtype=np.float32).reshape(-1)
+    results = collection.query(
+        query_embeddings=[query_emb.tolist()],
+        n_results=n_results,
+        include=["documents", "embeddings"],
+    )
+    ids = results["ids"][0]
+    chunk_embs = results["embeddings"][0]
+    if len(ids) == 0:
+        return []
+    similarities = _cosine_scores(query_emb, chunk_embs)
+    return _select_top(ids, results["documents"][0], similarities, similarity_cutoff, top_k)
+
+
+def retrieve_chunks(collection, query_emb, similarity_cutoff: float, top_k: int, mode: str = None,
+                    loc: Optional[str] = None) -> List[Tuple[str, str, float]]:
+    """
+    Retrieve the top_k chunks of a Chroma collection for a query embedding.
+
+    Args:
+        collection: Chroma collection of the chat thread.
+        query_emb: Query embedding (1-D or shape (1, dim)).
+        similarity_cutoff (float): Minimum cosine similarity to keep a chunk.
+        top_k (int): Maximum number of chunks to return.
+        mode (str, optional): "ann", "exact" or "mmap"; defaults to variables.retrieval_mode.
+        loc (str, optional): Collection directory, used as the key of the embedding matrix cache
+            and as the location of the sidecar embedding store ("mmap" needs it).
+
+    Returns:
+        List of (chunk_id, chunk_text, similarity) sorted by similarity descending.
+    """
+    mode = mode or retrieval_mode
+    if mode == "exact":
+        return retrieve_exact(collection, query_emb, similarity_cutoff, top_k, loc=loc)
+    if mode == "mmap" and loc is not None:
+        return retrieve_mmap(collection, query_emb, similarity_cutoff, top_k, loc)
+    return retrieve_ann(collection, query_emb, similarity_cutoff, top_k)
@@ -9,13 +9,53 @@ model_name = "Qwen2.5-7B-Instruct-AWQ"
 # model_name = "Qwen3-14B-AWQ"
 
 llm_url = "http://localhost:9002/v1"
+keyword_extractor_timeout = 15  # Seconds; on timeout RAG retrieval falls back to the raw query
+keyword_cache_size = 2048  # Extracted-keyword results kept in memory (LRU)
+keyword_cache_ttl = 3600  # Seconds an extracted-keyword result stays valid; None = no expiry
+keyword_local_max_words = 4  # Queries with at most this many words skip the LLM and use stopword filtering; 0 disables
+
+# LLM HTTP client (pooled, keep-alive connections to llm_url)
+llm_connection_limit = 100  # Max open connections per worker process
+llm_connection_limit_per_host = 32  # Max concurrent connections to the LLM server
+llm_keepalive_timeout = 30  # Seconds an idle connection is kept for reuse
+llm_connect_timeout = 5  # Seconds to establish a connection
+llm_read_timeout = 120  # Seconds to wait for the next bytes of a response (per streamed chunk)
 
 # Vector DB & Retreival 
 INDEXING_CHUNK_SIZE = 512
 INDEXING_CHUNK_OVERLAP = 64
 max_n_retreivals = 4
 rerank_score_threshold = -8.0
+retrieval_mode = "ann"  # Options: "ann" (Chroma HNSW query), "exact" (in-memory brute-force) or "mmap" (brute-force over the memory-mapped sidecar store)
+ann_candidate_multiplier = 4  # ANN fetches max_n_retreivals * this many candidates, then re-scores them by cosine
+embedding_cache_max_mb = 1024  # Memory budget of the in-process embedding matrix cache used by "exact" mode (LRU across collections)
+embedding_store_dtype = "float16"  # Options: "float16" or "float32" - row type of the "mmap" sidecar store
 history_size = 3
+chat_history_page_size = 30  # Messages rendered with the chat page; older ones are loaded in pages of this size on scroll
+parallel_raw_query_retrieval = False  # True: also retrieve on the raw query concurrently with keyword extraction and merge the results
+
+# Background indexing (manage.py run_indexing_worker)
+indexing_worker_concurrency = 2  # Jobs processed in parallel by one worker process
+document_load_timeout = 60  # Seconds before parsing a single uploaded file is abandoned
+document_loader_processes = 2  # Pre-warmed loader processes per worker; files of a job are parsed ahead in parallel
+indexing_job_stale_after = 900  # Seconds without a heartbeat before a running job is considered dead and requeued
+indexing_worker_missing_after = 30  # Seconds a job may stay pending before the pages warn that no worker seems to be running
+indexing_status_recent_seconds = 600  # Finished jobs stay listed (with per-file results) on the thread/collection page this long
+ingestion_batch_size = 256  # Chunks embedded together and written with one Chroma upsert
+ingestion_encode_batch_size = 64  # Batch size passed to SentenceTransformer.encode (bounded by GPU/CPU memory)
+chunk_cache_dir = "cache/document_chunks"  # Chunks + embeddings of indexed files by sha256; re-uploads skip parsing and encoding. None disables
+
+# Query embedding service (background worker with micro-batching)
+embedding_batch_max_size = 32  # Max query texts encoded in one batched call
+embedding_batch_wait_ms = 5  # Window for coalescing concurrent requests into one batch
+embedding_service_workers = 1  # Worker threads; they share one model, so more than 1 rarely helps
+query_embedding_cache_size = 4096  # Query embeddings kept in memory (LRU, keyed by model name + normalized text)
+query_embedding_cache_dir = None  # Optional directory for a disk-backed query embedding cache, e.g. "cache/query_embeddings"
+
+# Model loading
+# False: embedding/reranker models load lazily on first use (fast startup, first request pays the load)
+# True: MainConfig.ready() loads them at startup (pre-warmed workers) - applies to every process, incl. manage.py commands
+warm_up_models_on_startup = False
 
 # Database/Excel Query Settings
 MAX_QUERY_RETRIES = 7  # Maximum attempts to generate and execute correct query
@@ -26,6 +66,11 @@ translation_mode = "llm"  # Options: "argos" or "llm"
 # stop_sequence = "User:"
 stop_sequence = "Human:"
 
+# Token streaming - deltas are buffered and sent as one encrypted websocket frame when either limit is reached
+# Lower values: smoother typing effect; higher values: fewer frames and cipher calls per answer
+stream_flush_interval_ms = 50  # Max time buffered text waits before it is sent (checked as deltas arrive)
+stream_flush_min_chars = 64  # Send as soon as this many characters are buffered
+
 # setting device
 gpu=0
 device = torch.device(f"cuda:{gpu}" if torch.cuda.is_available() else "cpu")
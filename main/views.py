@@ -8,30 +8,23 @@ from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from django.db.models import Max, Count, Q
+from django.db.models import Max, Count, Q, OuterRef, Subquery
+from django.db.models.functions import Substr
 from main.utilities.helper_functions import create_folder, get_first_words, copy_folder_contents, hash_file
-from main.utilities.RAG import create_rag, index_builder, create_all_docs_collection
+from main.utilities.RAG import create_rag, create_all_docs_collection
+from main.utilities.retrieval import refresh_collection_caches
+from main.utilities.ingestion import open_chroma_collection, ingest_file
+from main.views_history import get_history_page
 from pathlib import Path
 from django.conf import settings
 import os, shutil, random, string
 from llama_index.core import SimpleDirectoryReader
-from llama_index.core import SummaryIndex, Document as llama_index_doc
 from main.utilities.encryption import *
 import base64
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
-import functools
 import logging
-import sys
-import time
-import gc
 
-# Configure logging for indexing (not AJAX spam)
-indexing_logger = logging.getLogger('indexing')
-indexing_logger.setLevel(logging.INFO)
-if not indexing_logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter('\n[INDEXING] %(message)s'))
-    indexing_logger.addHandler(handler)
+# Indexing logger, LlamaIndex signal patch and document loading live in main.utilities.indexing
+from main.utilities.indexing import indexing_logger, enqueue_indexing_job, target_jobs_progress
 
 # Diagnostic: Check what PDF libraries are available
 def check_pdf_libraries():
@@ -114,120 +107,6 @@ _startup_logger.info(f"collections_path: {collections_path}")
 _startup_logger.info(f"all_docs_collection_path: {all_docs_collection_path}")
 _startup_logger.info(f"=========================")
 
-# Disable signal alarm in LlamaIndex - it doesn't work in Django threads on Linux
-if sys.platform.startswith('linux'):
-    try:
-        # Monkey-patch signal to prevent LlamaIndex from using it in threads
-        import signal as _signal_module
-        _original_signal = _signal_module.signal
-        _original_alarm = _signal_module.alarm
-        
-        def _patched_signal(signalnum, handler):
-            import threading
-            if threading.current_thread() is threading.main_thread():
-                return _original_signal(signalnum, handler)
-            return None
-        
-        def _patched_alarm(time):
-            import threading
-            if threading.current_thread() is threading.main_thread():
-                return _original_alarm(time)
-            return 0
-        
-        _signal_module.signal = _patched_signal
-        _signal_module.alarm = _patched_alarm
-        indexing_logger.info("✓ Signal module patched for Linux")
-    except Exception as e:
-        indexing_logger.warning(f"Could not patch signal module: {e}")
-
-# Cross-platform timeout handler for document loading
-class TimeoutException(Exception):
-    pass
-
-def load_document_with_timeout(file_path, timeout_seconds=60):
-    """
-    Load a document with timeout protection.
-    Uses temporary file for IPC to avoid queue serialization issues.
-    Uses separate module for subprocess to avoid Django import issues on Windows.
-    """
-    import multiprocessing
-    import tempfile
-    import pickle
-    from main.utilities.document_loader import load_document_subprocess
-    
-    # Get file metadata for logging
-    file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-    ext = os.path.splitext(file_path)[1].lower()
-    
-    # Create temporary file for IPC
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pkl') as tmp:
-        result_file = tmp.name
-    
-    try:
-        process = multiprocessing.Process(target=load_document_subprocess, args=(file_path, result_file))
-        
-        indexing_logger.info(f"📄 File: {os.path.basename(file_path)} ({file_size:.2f} MB, {ext})")
-        indexing_logger.info(f"⏳ Starting subprocess to load document...")
-        start_time = time.time()
-        process.start()
-        
-        # Poll with progress updates
-        elapsed = 0
-        check_interval = 5
-        while process.is_alive() and elapsed < timeout_seconds:
-            time.sleep(check_interval)
-            elapsed = time.time() - start_time
-            if process.is_alive() and elapsed < timeout_seconds:
-                indexing_logger.info(f"   ... still loading ({int(elapsed)}s elapsed)")
-        
-        if process.is_alive():
-            # Still running after timeout - KILL IT
-            elapsed = time.time() - start_time
-            indexing_logger.warning(f"⚠ TIMEOUT after {int(elapsed)}s - KILLING process")
-            indexing_logger.warning(f"   The subprocess is stuck (not responding)")
-            process.terminate()
-            time.sleep(2)
-            if process.is_alive():
-                indexing_logger.warning(f"   Process still alive - using SIGKILL")
-                process.kill()
-            process.join(timeout=5)
-            raise TimeoutException(f"Document loading timed out after {timeout_seconds} seconds")
-        
-        # Process finished - read results from file
-        process.join()  # Ensure process is fully terminated
-        elapsed = time.time() - start_time
-        
-        if os.path.exists(result_file) and os.path.getsize(result_file) > 0:
-            try:
-                with open(result_file, 'rb') as f:
-                    status, result = pickle.load(f)
-                
-                if status == 'success':
-                    chunks = len(result) if result else 0
-                    indexing_logger.info(f"✓ SUCCESS in {elapsed:.1f}s ({chunks} chunks)")
-                    return result
-                else:
-                    indexing_logger.error(f"✗ FAILED in {elapsed:.1f}s")
-                    indexing_logger.error(f"   Error details:\n{result}")
-                    raise Exception(result)
-            except Exception as e:
-                if 'status' in locals():
-                    raise  # Re-raise if we already parsed the error above
-                else:
-                    indexing_logger.error(f"✗ Could not read results: {e}")
-                    raise Exception(f"Failed to read subprocess results: {e}")
-        else:
-            indexing_logger.error(f"✗ Process terminated without result (exit code: {process.exitcode})")
-            raise Exception(f"Process terminated without result (exit code: {process.exitcode})")
-    
-    finally:
-        # Clean up temporary file
-        try:
-            if os.path.exists(result_file):
-                os.unlink(result_file)
-        except:
-            pass
-
 # model_name = "TheBloke/Mistral-7B-Instruct-v0.2-AWQ"
 # model_name = "TheBloke/Mistral-7B-Instruct-v0.2-GPTQ"
 # model_name = "Qwen/Qwen2.5-7B-Instruct-GPTQ-Int4"
@@ -267,19 +146,21 @@ def chat_view(request, thread_id=None):
             # GET request - retrieve from session and decode from base64
             aes_key_b64 = request.session.get('aes_key', None)
             aes_key = base64.b64decode(aes_key_b64) if aes_key_b64 else None
-        threads = Thread.objects.filter(user=user).annotate(last_message_timestamp=Max('chatmessage__timestamp'))
+        # Last message text per thread in the same query (Subquery) instead of 2 queries per thread
+        last_message_preview = (ChatMessage.objects.filter(thread=OuterRef('pk')).order_by('-timestamp')
+                                .annotate(preview=Substr('message', 1, 80)).values('preview')[:1])
+        threads = Thread.objects.filter(user=user).annotate(last_message_timestamp=Max('chatmessage__timestamp'),
+                                                            last_message_preview=Subquery(last_message_preview))
         threads = threads.order_by('-last_message_timestamp')
         if len(threads) == 0:
-            # Check whether All docs collection exists in Collection table and filesystem
-            create_all_docs_collection()
             collections = Collection.objects.exclude(name=all_docs_collection_name).values('id', 'name')
             from main.utilities.variables import model_name
             context = {"no_threads": True, "active_thread_id": 0, 'collections': collections, 'model_name': model_name}
             return render(request, 'main/chat.html', context)
         threads_preview = dict()
         for thread in threads:
-            if ChatMessage.objects.filter(thread__id=thread.id).count() > 0:
-                txt = ChatMessage.objects.filter(thread__id=thread.id).latest('timestamp').message[:80]
+            if thread.last_message_preview is not None:
+                txt = thread.last_message_preview
                 preview_raw = get_first_words(txt, 40)
                 preview_clean = ''.join(ch if (ch.isalnum() or ch.isspace() or ch in '.,!?') else '' for ch in preview_raw)
                 preview_clean = ' '.join(preview_clean.split())  # collapse extra spaces
@@ -295,23 +176,8 @@ def chat_view(request, thread_id=None):
         # print(f"\nthreads: {threads}\n")
         # print(f"\nthreads_ids: {threads_ids}\n")
 
-        # Check whether All docs collection exists in Collection table and filesystem
-        create_all_docs_collection()
-
-        # Delete threads directories that their model instance have been removed before.
-        try:
-            threads_names = ["vdb_" + x for x in list(threads.values_list("name", flat=True))]
-            user_db_path = os.path.join(vector_db_path, user.username)
-            user_db_vdbs = os.listdir(user_db_path)
-            to_be_deleted_threads = [vdb for vdb in user_db_vdbs if vdb not in threads_names]
-            for vdb in to_be_deleted_threads:
-                try:
-                    vdb_path = os.path.join(user_db_path, vdb)
-                    shutil.rmtree(vdb_path, ignore_errors=False, onerror=None)
-                except:
-                    continue
-        except:
-            pass
+        # Orphaned vector DB cleanup and the all-docs collection check run in the background:
+        # python manage.py maintain_vector_dbs --interval 3600
 
         collections = Collection.objects.exclude(name=all_docs_collection_name).values('id', 'name')
         if (thread_id is None):
@@ -321,13 +187,9 @@ def chat_view(request, thread_id=None):
                        "no_threads": True, "active_thread_id": 0, 'model_name': model_name}
             return render(request, 'main/chat.html', context)
         thread_id = int(thread_id)
-        messages = ChatMessage.objects.filter(user=user, thread=thread_id)
-        # Encrypt messages if aes_key is available
-        if aes_key:
-            for message in messages:
-                encrypted_message = encrypt_AES_ECB(message.message, aes_key).decode('utf-8')
-                message.message = encrypted_message
-                # print(decrypt_AES_ECB(encrypted_message ,aes_key))
+        # Only the latest page is encrypted and rendered; older pages are fetched on scroll (chat_history_view)
+        messages, has_older_messages = get_history_page(user, thread_id, aes_key)
+        oldest_message_id = messages[0].id if messages else None
         active_thread = Thread.objects.get(id=thread_id)
         active_thread_name = active_thread.name
         rag_docs = active_thread.docs.all()
@@ -345,7 +207,9 @@ def chat_view(request, thread_id=None):
         print(f"\ncollections: {collections}\n")
         context = {"chat_threads": threads, "active_thread_id": thread_id, "active_thread_name": active_thread_name, "rag_docs": rag_docs,
                    "base_collection": base_collection, "base_collection_name": base_collection_name, "base_collection_type": base_collection_type, "base_collection_db_type": base_collection_db_type, 
-                   "collection_docs": collection_docs, "messages": messages, "threads_preview": threads_preview, 'collections': collections, 'model_name': model_name}
+                   "collection_docs": collection_docs, "messages": messages, "has_older_messages": has_older_messages,
+                   "oldest_message_id": oldest_message_id, "threads_preview": threads_preview, 'collections': collections, 'model_name': model_name,
+                   "indexing_jobs": target_jobs_progress(thread=active_thread)}
         print(f"\n\n{active_thread_name}\n\n")
         return render(request, 'main/chat.html', context)
 
@@ -367,7 +231,7 @@ def create_rag_view(request,):  # Erros front should handle: 1-similar rag_name,
             create_rag(vdb_path)
             create_folder(docs_path)
             vdb = Thread.objects.create(user=user, name=rag_name, description=description, loc=vdb_path,)
-            index = index_builder(vdb_path)
+            chroma_collection = open_chroma_collection(vdb_path)
             # all_docs_index = index_builder(all_docs_collection_path)
             for file in uploaded_files:
                 file_name = file.name
@@ -376,18 +240,18 @@ def create_rag_view(request,):  # Erros front should handle: 1-similar rag_name,
                 doc_path = default_storage.get_available_name(doc_path)
                 default_storage.save(doc_path, ContentFile(file.read()))
 
-                document = SimpleDirectoryReader(input_files=[doc_path]).load_data()
                 doc_sha256 = hash_file(doc_path)["sha256"]
 
                 doc_obj = Document.objects.create(user=user, name=file_name, public=False,
                                                   description=None, loc=doc_path, sha256= doc_sha256)
-                # Create indexes
-                for idx, chunked_doc in enumerate(document):
-                    doc = llama_index_doc(text=chunked_doc.text, id_=f"{doc_obj.id}_{idx}")
-                    index.insert(doc)
+                # Embed in batches and upsert into the thread's collection (copied from the chunk cache for known files)
+                ingest_file(chroma_collection, doc_obj.id, doc_sha256,
+                            lambda: SimpleDirectoryReader(input_files=[doc_path]).load_data())
                 vdb.docs.add(doc_obj)
+            refresh_collection_caches(vdb_path, chroma_collection)
         else:
             if base_collection_id == "all_docs_collection":
+                create_all_docs_collection()  # Not created yet on a fresh install (no collection or maintenance run so far)
                 base_collection = Collection.objects.get(name=all_docs_collection_name)
             else:
                 base_collection = Collection.objects.get(id=base_collection_id)
@@ -409,75 +273,8 @@ def add_docs_view(request, thread_id):
         vdb_path = os.path.join(vector_db_path, user.username, f'vdb_{rag_name}')
         docs_path = os.path.join(vdb_path, "docs")
 
-        # build index
-        index = index_builder(vdb_path)
-        vdb = Thread.objects.get(user=user, name=rag_name)
-        
-        # Initialize progress tracking in session
-        total_files = len(uploaded_files)
-        request.session['indexing_progress'] = {'current': 0, 'total': total_files, 'filename': ''}
-        request.session.save()
-        indexing_logger.info(f"\\n{'='*60}\\nStarting indexing: {total_files} files\\n{'='*60}")
-
-        for file_idx, file in enumerate(uploaded_files, 1):
-            file_name = file.name
-            # Update progress
-            request.session['indexing_progress'] = {'current': file_idx, 'total': total_files, 'filename': file_name}
-            request.session.save()
-            # Minimal console output
-            doc_path = os.path.join(docs_path, file_name)
-            doc_path = default_storage.get_available_name(doc_path)
-            default_storage.save(doc_path, ContentFile(file.read()))
-
-            # Load document with timeout protection
-            indexing_logger.info(f"Processing file {file_idx}/{total_files}: {file_name}")
-            try:
-                documents = load_document_with_timeout(doc_path, timeout_seconds=60)
-            except TimeoutException as e:
-                indexing_logger.warning(f"⚠ SKIPPED (timeout): {file_name}")
-                continue
-            except Exception as e:
-                indexing_logger.error(f"✗ SKIPPED (error): {file_name} - {str(e)}")
-                continue
-            
-            # Document loaded successfully, now index it
-            try:
-                indexing_logger.info(f"   Creating document object and indexing...")
-                doc_sha256 = hash_file(doc_path)["sha256"]
-
-                # Save document info
-                doc_obj = Document.objects.create(
-                    user=user,
-                    name=file_name,
-                    public=False,
-                    description=None,
-                    loc=doc_path,
-                    sha256=doc_sha256
-                )
-                indexing_logger.info(f"   ✓ Document object created (ID: {doc_obj.id})")
-
-                # Insert chunks into index
-                indexing_logger.info(f"   Inserting {len(documents)} chunks into index...")
-                for idx, chunked_doc in enumerate(documents):
-                    doc = llama_index_doc(text=chunked_doc.text, id_=f"{doc_obj.id}_{idx}")
-                    index.insert(doc)
-
-                vdb.docs.add(doc_obj)
-                indexing_logger.info(f"✓ COMPLETED: {file_name}")
-                
-            except Exception as e:
-                indexing_logger.error(f"✗ INDEXING FAILED for {file_name}: {str(e)}")
-                import traceback
-                indexing_logger.error(traceback.format_exc())
-                # Delete the file if indexing failed
-                if os.path.exists(doc_path):
-                    os.remove(doc_path)
-                continue
-        
-        # Clear progress after completion
-        request.session['indexing_progress'] = None
-        request.session.save()
-        indexing_logger.info(f"\n{'='*60}\n✓ INDEXING COMPLETED\n{'='*60}\n")
+        # Files are saved now and indexed by the background worker (manage.py run_indexing_worker)
+        enqueue_indexing_job(user, uploaded_files, docs_path, vdb_path, thread=thread)
 
         return redirect('main:chat', thread_id=thread_id)
 
@@ -519,7 +316,8 @@ def collections_view(request, collection_id=None,):
                     "db_type": collection.db_type,
                     "db_connection_string": collection.db_connection_string,
                     "excel_file_paths": collection.excel_file_paths,
-                    "db_extra_knowledge": collection.db_extra_knowledge,}
+                    "db_extra_knowledge": collection.db_extra_knowledge,
+                    "indexing_jobs": target_jobs_progress(collection=collection),}
         return render(request, 'main/collections.html', context)
 
 
@@ -573,19 +371,6 @@ def collection_create_view(request,):
             
             create_all_docs_collection()
 
-            indexing_logger.info(f"[collection_create_view] Calling index_builder({collection_path})...")
-            index = index_builder(collection_path)
-            indexing_logger.info(f"[collection_create_view] ✓ index_builder completed, index type: {type(index)}")
-            
-            # Verify SQLite database was created
-            sqlite_path = os.path.join(collection_path, "chroma.sqlite3")
-            indexing_logger.info(f"[collection_create_view] Checking for SQLite database...")
-            indexing_logger.info(f"[collection_create_view] Expected path: {sqlite_path}")
-            indexing_logger.info(f"[collection_create_view] SQLite exists: {os.path.exists(sqlite_path)}")
-            if os.path.exists(collection_path):
-                indexing_logger.info(f"[collection_create_view] Collection directory contents: {os.listdir(collection_path)}")
-            
-            all_docs_index = index_builder(all_docs_collection_path)
             collection_vdb = Collection.objects.create(
                 user_created=user, 
                 name=collection_name, 
@@ -593,236 +378,10 @@ def collection_create_view(request,):
                 loc=collection_path,
                 collection_type='document'
             )
-
-            all_docs_collection_vdb = Collection.objects.get(name=all_docs_collection_name)
             collection_vdb.allowed_groups.set(allowed_groups)
-            
-            # Initialize progress tracking in session
-            total_files = len(uploaded_files)
-            request.session['indexing_progress'] = {'current': 0, 'total': total_files, 'filename': ''}
-            request.session.save()
-            print(f"[Progress] Initialized: 0/{total_files}")
-            
-            for idx, file in enumerate(uploaded_files, 1):
-                file_name = file.name
-                # Update progress
-                request.session['indexing_progress'] = {'current': idx, 'total': total_files, 'filename': file_name}
-                request.session.save()
-                
-                # Minimal console output
-                doc_path = os.path.join(docs_path, file_name)
-                doc_path = default_storage.get_available_name(doc_path)
-                default_storage.save(doc_path, ContentFile(file.read()))
-
-                # Load document with timeout protection
-                indexing_logger.info(f"Processing file {idx}/{total_files}: {file_name}")
-                try:
-                    document = load_document_with_timeout(doc_path, timeout_seconds=60)
-                except TimeoutException as e:
-                    indexing_logger.warning(f"⚠ SKIPPED (timeout): {file_name}")
-                    continue
-                except Exception as e:
-                    indexing_logger.error(f"✗ SKIPPED (error): {file_name} - {str(e)}")
-                    continue
-                
-                # Document loaded successfully, now index it
-                try:
-                    indexing_logger.info(f"   Creating document object and indexing...")
-                    doc_sha256 = hash_file(doc_path)["sha256"]
 
-                    doc_obj = Document.objects.create(user=user, name=file_name, public=False,
-                                                      description=None, loc=doc_path, sha256=doc_sha256)
-                    indexing_logger.info(f"   ✓ Document object created (ID: {doc_obj.id})")
-                    
-                    # Create indexes - FIX: Batch insertions and separate index operations to avoid SQLite contention on Linux
-                    indexing_logger.info(f"   Preparing {len(document)} chunks for indexing...")
-                    indexing_logger.info(f"   Index object: {index}")
-                    indexing_logger.info(f"   All_docs_index object: {all_docs_index}")
-                    
-                    # Create all LlamaIndex documents first
-                    docs_to_index = []
-                    for idx_chunk, chunked_doc in enumerate(document):
-                        doc = llama_index_doc(text=chunked_doc.text, id_=f"{doc_obj.id}_{idx_chunk}")
-                        docs_to_index.append(doc)
-                    indexing_logger.info(f"   ✓ Created {len(docs_to_index)} document objects")
-                    
-                    if doc_sha256 not in all_docs_collection_vdb.docs.values_list("sha256", flat=True):
-                        # Insert all chunks into collection index first (batch operation with micro-batches for Linux)
-                        indexing_logger.info(f"   Inserting {len(docs_to_index)} chunks into COLLECTION index...")
-                        MICRO_BATCH_SIZE = 3  # Insert 3 chunks at a time to prevent resource exhaustion
-                        for i in range(0, len(docs_to_index), MICRO_BATCH_SIZE):
-                            batch_end = min(i + MICRO_BATCH_SIZE, len(docs_to_index))
-                            indexing_logger.info(f"   Micro-batch {i//MICRO_BATCH_SIZE + 1}: chunks {i+1}-{batch_end}")
-                            
-                            for idx_chunk in range(i, batch_end):
-                                doc = docs_to_index[idx_chunk]
-                                indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] Collection insert...")
-                                try:
-                                    index.insert(doc)
-                                    indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] ✓")
-                                except Exception as e:
-                                    indexing_logger.error(f"      ✗ Collection insert failed: {e}")
-                                    raise
-                            
-                            # Force garbage collection and small pause after each micro-batch
-                            if sys.platform.startswith('linux'):
-                                gc.collect()
-                                time.sleep(0.1)
-                                indexing_logger.info(f"   Micro-batch complete, memory cleared")
-                        
-                        indexing_logger.info(f"   ✓ All chunks inserted into collection index")
-                        
-                        # Give ChromaDB/SQLite time to commit on Linux
-                        if sys.platform.startswith('linux'):
-                            indexing_logger.info(f"   [Linux] Pausing 1s for SQLite commit...")
-                            time.sleep(1.0)
-                            gc.collect()
-                        
-                        # Verify collection directory and SQLite database
-                        indexing_logger.info(f"   Verifying collection persistence...")
-                        sqlite_path = os.path.join(collection_path, "chroma.sqlite3")
-                        if os.path.exists(sqlite_path):
-                            indexing_logger.info(f"   ✓ SQLite database exists: {os.path.getsize(sqlite_path)} bytes")
-                        else:
-                            indexing_logger.error(f"   ✗ SQLite database NOT FOUND at: {sqlite_path}")
-                            indexing_logger.error(f"   Collection directory contents: {os.listdir(collection_path) if os.path.exists(collection_path) else 'DIR NOT FOUND'}")
-                        
-                        # Verify collection directory and SQLite database                        indexing_logger.info(f"   Verifying collection persistence...")
-                        sqlite_path = os.path.join(collection_path, "chroma.sqlite3")
-                        if os.path.exists(sqlite_path):
-                            indexing_logger.info(f"   ✓ SQLite database exists: {os.path.getsize(sqlite_path)} bytes")
-                        else:
-                            indexing_logger.error(f"   ✗ SQLite database NOT FOUND at: {sqlite_path}")
-                            indexing_logger.error(f"   Collection directory contents: {os.listdir(collection_path) if os.path.exists(collection_path) else 'DIR NOT FOUND'}")
-                        
-                        # Now insert all chunks into all_docs index (separate batch)
-                        indexing_logger.info(f"   Inserting {len(docs_to_index)} chunks into ALL_DOCS index...")
-                        for i in range(0, len(docs_to_index), MICRO_BATCH_SIZE):
-                            batch_end = min(i + MICRO_BATCH_SIZE, len(docs_to_index))
-                            indexing_logger.info(f"   Micro-batch {i//MICRO_BATCH_SIZE + 1}: chunks {i+1}-{batch_end}")
-                            
-                            for idx_chunk in range(i, batch_end):
-                                doc = docs_to_index[idx_chunk]
-                                indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] All_docs insert...")
-                                try:
-                                    all_docs_index.insert(doc)
-                                    indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] ✓")
-                                except Exception as e:
-                                    indexing_logger.error(f"      ✗ All_docs insert failed: {e}")
-                                    raise
-                            
-                            # Force garbage collection and small pause after each micro-batch
-                            if sys.platform.startswith('linux'):
-                                gc.collect()
-                                time.sleep(0.1)
-                                indexing_logger.info(f"   Micro-batch complete, memory cleared")
-                        
-                        indexing_logger.info(f"   ✓ All chunks inserted into all_docs index")
-                        
-                        # Verify all_docs persistence
-                        all_docs_sqlite = os.path.join(all_docs_collection_path, "chroma.sqlite3")
-                        if os.path.exists(all_docs_sqlite):
-                            indexing_logger.info(f"   ✓ All_docs SQLite: {os.path.getsize(all_docs_sqlite)} bytes")
-                        
-                        # Verify all_docs persistence
-                        all_docs_sqlite = os.path.join(all_docs_collection_path, "chroma.sqlite3")
-                        if os.path.exists(all_docs_sqlite):
-                            indexing_logger.info(f"   ✓ All_docs SQLite: {os.path.getsize(all_docs_sqlite)} bytes")
-                        
-                        # Force ChromaDB sync on Linux by querying count
-                        if sys.platform.startswith('linux'):
-                            indexing_logger.info(f"   [Linux] Ensuring ChromaDB sync...")
-                            try:
-                                if hasattr(index, '_chroma_collection'):
-                                    count = index._chroma_collection.count()
-                                    indexing_logger.info(f"   ✓ Collection has {count} vectors in ChromaDB")
-                                if hasattr(all_docs_index, '_chroma_collection'):
-                                    all_count = all_docs_index._chroma_collection.count()
-                                    indexing_logger.info(f"   ✓ All_docs has {all_count} vectors in ChromaDB")
-                                time.sleep(0.5)  # Give filesystem time to sync
-                            except Exception as e:
-                                indexing_logger.warning(f"   ⚠ ChromaDB sync check failed: {e}")
-                        
-                        all_docs_collection_vdb.docs.add(doc_obj)
-                        collection_vdb.docs.add(doc_obj)
-                        indexing_logger.info(f"   ✓ Indexed to collection and all_docs")
-                    else:
-                        # Only insert into collection index
-                        indexing_logger.info(f"   Document already in all_docs, inserting {len(docs_to_index)} chunks into collection only...")
-                        MICRO_BATCH_SIZE = 3
-                        for i in range(0, len(docs_to_index), MICRO_BATCH_SIZE):
-                            batch_end = min(i + MICRO_BATCH_SIZE, len(docs_to_index))
-                            indexing_logger.info(f"   Micro-batch {i//MICRO_BATCH_SIZE + 1}: chunks {i+1}-{batch_end}")
-                            
-                            for idx_chunk in range(i, batch_end):
-                                doc = docs_to_index[idx_chunk]
-                                indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] Collection insert...")
-                                try:
-                                    index.insert(doc)
-                                    indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] ✓")
-                                except Exception as e:
-                                    indexing_logger.error(f"      ✗ Insert failed: {e}")
-                                    raise
-                            
-                            # Force garbage collection and small pause after each micro-batch
-                            if sys.platform.startswith('linux'):
-                                gc.collect()
-                                time.sleep(0.1)
-                                indexing_logger.info(f"   Micro-batch complete, memory cleared")
-                        
-                        indexing_logger.info(f"   ✓ All chunks inserted into collection")
-                        
-                        # Verify collection persistence
-                        indexing_logger.info(f"   Verifying collection persistence...")
-                        sqlite_path = os.path.join(collection_path, "chroma.sqlite3")
-                        if os.path.exists(sqlite_path):
-                            indexing_logger.info(f"   ✓ SQLite database exists: {os.path.getsize(sqlite_path)} bytes")
-                        else:
-                            indexing_logger.error(f"   ✗ SQLite database NOT FOUND at: {sqlite_path}")
-                            indexing_logger.error(f"   Collection directory contents: {os.listdir(collection_path) if os.path.exists(collection_path) else 'DIR NOT FOUND'}")
-                        
-                        
-                        # Verify collection persistence
-                        indexing_logger.info(f"   Verifying collection persistence...")
-                        sqlite_path = os.path.join(collection_path, "chroma.sqlite3")
-                        if os.path.exists(sqlite_path):
-                            indexing_logger.info(f"   ✓ SQLite database exists: {os.path.getsize(sqlite_path)} bytes")
-                        else:
-                            indexing_logger.error(f"   ✗ SQLite database NOT FOUND at: {sqlite_path}")
-                            indexing_logger.error(f"   Collection directory contents: {os.listdir(collection_path) if os.path.exists(collection_path) else 'DIR NOT FOUND'}")
-                        
-                        # Force ChromaDB sync on Linux by querying count
-                        if sys.platform.startswith('linux'):
-                            indexing_logger.info(f"   [Linux] Ensuring ChromaDB sync...")
-                            try:
-                                if hasattr(index, '_chroma_collection'):
-                                    count = index._chroma_collection.count()
-                                    indexing_logger.info(f"   ✓ Collection has {count} vectors in ChromaDB")
-                                time.sleep(0.5)  # Give filesystem time to sync
-                            except Exception as e:
-                                indexing_logger.warning(f"   ⚠ ChromaDB sync check failed: {e}")
-                        
-                        collection_vdb.docs.add(doc_obj)
-                        indexing_logger.info(f"   ✓ Indexed to collection")
-                    
-                    # Verify document was added
-                    doc_count = collection_vdb.docs.count()
-                    indexing_logger.info(f"   Collection now has {doc_count} documents")
-                    indexing_logger.info(f"✓ COMPLETED: {file_name}")
-                    
-                except Exception as e:
-                    indexing_logger.error(f"✗ INDEXING FAILED for {file_name}: {str(e)}")
-                    import traceback
-                    indexing_logger.error(traceback.format_exc())
-                    # Delete the file if indexing failed
-                    if os.path.exists(doc_path):
-                        os.remove(doc_path)
-                    continue
-            
-            # Clear progress after completion
-            request.session['indexing_progress'] = None
-            request.session.save()
-            indexing_logger.info(f"\n{'='*60}\n✓ INDEXING COMPLETED\n{'='*60}\n")
+            # Files are saved now and indexed by the background worker (manage.py run_indexing_worker)
+            enqueue_indexing_job(user, uploaded_files, docs_path, collection_path, collection=collection_vdb)
         
         elif collection_type == "database":
             # Database-backed collection
@@ -1138,7 +697,6 @@ def collection_add_docs_view(request, collection_id):
         uploaded_files = request.FILES.getlist('files')
         collection_id = int(collection_id)
         collection_vdb = Collection.objects.get(id=collection_id)  # Now each Admin can add to any of collections
-        all_docs_collection_vdb = Collection.objects.get(name=all_docs_collection_name)
         if user.is_advanced_user() and not (user.is_admin() or user.is_superuser):
             if collection_vdb.user_created != user:
                 return redirect('main:main_collection')
@@ -1176,216 +734,10 @@ def collection_add_docs_view(request, collection_id):
                 indexing_logger.error(f"[collection_add_docs_view] ✗ Failed to create docs folder: {e}")
                 return JsonResponse({'error': f'Failed to create docs folder: {e}'}, status=500)
         
-        index = index_builder(collection_path)
         create_all_docs_collection()
-        all_docs_index = index_builder(all_docs_collection_path)
-        
-        # Initialize progress tracking in session
-        total_files = len(uploaded_files)
-        request.session['indexing_progress'] = {'current': 0, 'total': total_files, 'filename': ''}
-        request.session.save()
-        indexing_logger.info(f"\n{'='*60}\nStarting indexing: {total_files} files\n{'='*60}")
-        
-        for file_idx, file in enumerate(uploaded_files, 1):
-            file_name = file.name
-            # Update progress
-            request.session['indexing_progress'] = {'current': file_idx, 'total': total_files, 'filename': file_name}
-            request.session.save()
-            
-            # Minimal console output  
-            doc_path = os.path.join(docs_path, file_name)
-            doc_path = default_storage.get_available_name(doc_path)
-            default_storage.save(doc_path, ContentFile(file.read()))
-
-            # Load document with timeout protection
-            indexing_logger.info(f"Processing file {file_idx}/{total_files}: {file_name}")
-            try:
-                document = load_document_with_timeout(doc_path, timeout_seconds=60)
-            except TimeoutException as e:
-                indexing_logger.warning(f"⚠ SKIPPED (timeout): {file_name}")
-                continue
-            except Exception as e:
-                indexing_logger.error(f"✗ SKIPPED (error): {file_name} - {str(e)}")
-                continue
-            
-            # Document loaded successfully, now index it
-            try:
-                indexing_logger.info(f"   Creating document object and indexing...")
-                doc_sha256 = hash_file(doc_path)["sha256"]
 
-                doc_obj = Document.objects.create(user=user, name=file_name, public=False,
-                                                  description=None, loc=doc_path, sha256=doc_sha256)
-                indexing_logger.info(f"   ✓ Document object created (ID: {doc_obj.id})")
-                
-                # Create indexes - FIX: Batch insertions and separate index operations to avoid SQLite contention on Linux
-                indexing_logger.info(f"   Preparing {len(document)} chunks for indexing...")
-                indexing_logger.info(f"   Index object: {index}")
-                indexing_logger.info(f"   All_docs_index object: {all_docs_index}")
-                
-                # Create all LlamaIndex documents first
-                docs_to_index = []
-                for idx_chunk, chunked_doc in enumerate(document):
-                    doc = llama_index_doc(text=chunked_doc.text, id_=f"{doc_obj.id}_{idx_chunk}")
-                    docs_to_index.append(doc)
-                indexing_logger.info(f"   ✓ Created {len(docs_to_index)} document objects")
-                
-                if doc_sha256 not in all_docs_collection_vdb.docs.values_list("sha256", flat=True):
-                    # Insert all chunks into collection index first (batch operation with micro-batches for Linux)
-                    indexing_logger.info(f"   Inserting {len(docs_to_index)} chunks into COLLECTION index...")
-                    MICRO_BATCH_SIZE = 3  # Insert 3 chunks at a time to prevent resource exhaustion
-                    for i in range(0, len(docs_to_index), MICRO_BATCH_SIZE):
-                        batch_end = min(i + MICRO_BATCH_SIZE, len(docs_to_index))
-                        indexing_logger.info(f"   Micro-batch {i//MICRO_BATCH_SIZE + 1}: chunks {i+1}-{batch_end}")
-                        
-                        for idx_chunk in range(i, batch_end):
-                            doc = docs_to_index[idx_chunk]
-                            indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] Collection insert...")
-                            try:
-                                index.insert(doc)
-                                indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] ✓")
-                            except Exception as e:
-                                indexing_logger.error(f"      ✗ Collection insert failed: {e}")
-                                raise
-                        
-                        # Force garbage collection and small pause after each micro-batch
-                        if sys.platform.startswith('linux'):
-                            gc.collect()
-                            time.sleep(0.1)
-                            indexing_logger.info(f"   Micro-batch complete, memory cleared")
-                    
-                    indexing_logger.info(f"   ✓ All chunks inserted into collection index")
-                    
-                    # Give ChromaDB/SQLite time to commit on Linux
-                    if sys.platform.startswith('linux'):
-                        indexing_logger.info(f"   [Linux] Pausing 1s for SQLite commit...")
-                        time.sleep(1.0)
-                        gc.collect()
-                    
-                    # Now insert all chunks into all_docs index (separate batch)
-                    indexing_logger.info(f"   Inserting {len(docs_to_index)} chunks into ALL_DOCS index...")
-                    for i in range(0, len(docs_to_index), MICRO_BATCH_SIZE):
-                        batch_end = min(i + MICRO_BATCH_SIZE, len(docs_to_index))
-                        indexing_logger.info(f"   Micro-batch {i//MICRO_BATCH_SIZE + 1}: chunks {i+1}-{batch_end}")
-                        
-                        for idx_chunk in range(i, batch_end):
-                            doc = docs_to_index[idx_chunk]
-                            indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] All_docs insert...")
-                            try:
-                                all_docs_index.insert(doc)
-                                indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] ✓")
-                            except Exception as e:
-                                indexing_logger.error(f"      ✗ All_docs insert failed: {e}")
-                                raise
-                        
-                        # Force garbage collection and small pause after each micro-batch
-                        if sys.platform.startswith('linux'):
-                            gc.collect()
-                            time.sleep(0.1)
-                            indexing_logger.info(f"   Micro-batch complete, memory cleared")
-                    
-                    indexing_logger.info(f"   ✓ All chunks inserted into all_docs index")
-                    
-                    # Force ChromaDB sync on Linux by querying count
-                    if sys.platform.startswith('linux'):
-                        indexing_logger.info(f"   [Linux] Ensuring ChromaDB sync...")
-                        try:
-                            if hasattr(index, '_chroma_collection'):
-                                count = index._chroma_collection.count()
-                                indexing_logger.info(f"   ✓ Collection has {count} vectors in ChromaDB")
-                            if hasattr(all_docs_index, '_chroma_collection'):
-                                all_count = all_docs_index._chroma_collection.count()
-                                indexing_logger.info(f"   ✓ All_docs has {all_count} vectors in ChromaDB")
-                            time.sleep(0.5)  # Give filesystem time to sync
-                        except Exception as e:
-                            indexing_logger.warning(f"   ⚠ ChromaDB sync check failed: {e}")
-                    
-                    all_docs_collection_vdb.docs.add(doc_obj)
-                    collection_vdb.docs.add(doc_obj)
-                    indexing_logger.info(f"   ✓ Indexed to collection and all_docs")
-                else:
-                    # Only insert into collection index
-                    indexing_logger.info(f"   Document already in all_docs, inserting {len(docs_to_index)} chunks into collection only...")
-                    MICRO_BATCH_SIZE = 3
-                    for i in range(0, len(docs_to_index), MICRO_BATCH_SIZE):
-                        batch_end = min(i + MICRO_BATCH_SIZE, len(docs_to_index))
-                        indexing_logger.info(f"   Micro-batch {i//MICRO_BATCH_SIZE + 1}: chunks {i+1}-{batch_end}")
-                        
-                        for idx_chunk in range(i, batch_end):
-                            doc = docs_to_index[idx_chunk]
-                            indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] Collection insert...")
-                            try:
-                                index.insert(doc)
-                                indexing_logger.info(f"      [{idx_chunk+1}/{len(docs_to_index)}] ✓")
-                            except Exception as e:
-                                indexing_logger.error(f"      ✗ Insert failed: {e}")
-                                raise
-                        
-                        # Force garbage collection and small pause after each micro-batch
-                        if sys.platform.startswith('linux'):
-                            gc.collect()
-                            time.sleep(0.1)
-                            indexing_logger.info(f"   Micro-batch complete, memory cleared")
-                    
-                    indexing_logger.info(f"   ✓ All chunks inserted into collection")
-                    
-                    # Force ChromaDB sync on Linux by querying count
-                    if sys.platform.startswith('linux'):
-                        indexing_logger.info(f"   [Linux] Ensuring ChromaDB sync...")
-                        try:
-                            if hasattr(index, '_chroma_collection'):
-                                count = index._chroma_collection.count()
-                                indexing_logger.info(f"   ✓ Collection has {count} vectors in ChromaDB")
-                            time.sleep(0.5)  # Give filesystem time to sync
-                        except Exception as e:
-                            indexing_logger.warning(f"   ⚠ ChromaDB sync check failed: {e}")
-                    
-                    collection_vdb.docs.add(doc_obj)
-                    indexing_logger.info(f"   ✓ Indexed to collection")
-                
-                # Verify document was added
-                doc_count = collection_vdb.docs.count()
-                indexing_logger.info(f"   Collection now has {doc_count} documents")
-                
-                # FINAL VERIFICATION: Check SQLite database
-                final_sqlite_check = os.path.join(collection_path, "chroma.sqlite3")
-                if os.path.exists(final_sqlite_check):
-                    size_kb = os.path.getsize(final_sqlite_check) / 1024
-                    indexing_logger.info(f"   ✓ FINAL CHECK: SQLite DB = {size_kb:.2f} KB")
-                    indexing_logger.info(f"   ✓ Collection path for querying: {collection_path}")
-                    indexing_logger.info(f"   ✓ Collection DB entry loc: {collection_vdb.loc}")
-                else:
-                    indexing_logger.error(f"   ✗ FINAL CHECK: SQLite DB MISSING!")
-                    indexing_logger.error(f"   Collection path: {collection_path}")
-                    indexing_logger.error(f"   Directory contents: {os.listdir(collection_path) if os.path.exists(collection_path) else 'DIR NOT FOUND'}")
-                
-                
-                # FINAL VERIFICATION: Check SQLite database
-                final_sqlite_check = os.path.join(collection_path, "chroma.sqlite3")
-                if os.path.exists(final_sqlite_check):
-                    size_kb = os.path.getsize(final_sqlite_check) / 1024
-                    indexing_logger.info(f"   ✓ FINAL CHECK: SQLite DB = {size_kb:.2f} KB")
-                    indexing_logger.info(f"   ✓ Collection path for querying: {collection_path}")
-                    indexing_logger.info(f"   ✓ Collection DB entry loc: {collection_vdb.loc}")
-                else:
-                    indexing_logger.error(f"   ✗ FINAL CHECK: SQLite DB MISSING!")
-                    indexing_logger.error(f"   Collection path: {collection_path}")
-                    indexing_logger.error(f"   Directory contents: {os.listdir(collection_path) if os.path.exists(collection_path) else 'DIR NOT FOUND'}")
-                
-                indexing_logger.info(f"✓ COMPLETED: {file_name}")
-                
-            except Exception as e:
-                indexing_logger.error(f"✗ INDEXING FAILED for {file_name}: {str(e)}")
-                import traceback
-                indexing_logger.error(traceback.format_exc())
-                # Delete the file if indexing failed
-                if os.path.exists(doc_path):
-                    os.remove(doc_path)
-                continue
-        
-        # Clear progress after completion
-        request.session['indexing_progress'] = None
-        request.session.save()
-        indexing_logger.info(f"\n{'='*60}\n✓ INDEXING COMPLETED\n{'='*60}\n")
+        # Files are saved now and indexed by the background worker (manage.py run_indexing_worker)
+        enqueue_indexing_job(user, uploaded_files, docs_path, collection_path, collection=collection_vdb)
 
         return redirect('main:collection', collection_id=collection_id)
 
@@ -0,0 +1,46 @@
+"""
+Paginated chat history - chat_view renders only the latest page, older pages are fetched on scroll
+"""
+import base64
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.contrib.auth.decorators import login_required
+from main.models import ChatMessage
+from main.utilities.encryption import encrypt_AES_ECB_bulk
+from main.utilities.variables import chat_history_page_size
+
+
+def get_history_page(user, thread_id, aes_key, before_id=None, limit=chat_history_page_size):
+    """
+    Return (messages oldest -> newest, has_more) for the `limit` messages of a thread preceding before_id
+    (the latest ones when before_id is None). Message texts are encrypted in bulk when aes_key is given.
+    """
+    messages_qs = ChatMessage.objects.filter(user=user, thread=thread_id)
+    if before_id is not None:
+        messages_qs = messages_qs.filter(id__lt=before_id)
+    page = list(messages_qs.order_by('-id')[:limit + 1])
+    has_more = len(page) > limit
+    messages = list(reversed(page[:limit]))
+    if aes_key:
+        for message, encrypted_message in zip(messages, encrypt_AES_ECB_bulk([m.message for m in messages], aes_key)):
+            message.message = encrypted_message
+    return messages, has_more
+
+
+@login_required(login_url='users:login')
+def chat_history_view(request, thread_id):
+    """Older messages of a thread as rendered (encrypted) HTML, for lazy loading on scroll."""
+    aes_key_b64 = request.session.get('aes_key', None)
+    if not aes_key_b64:
+        return JsonResponse({'error': 'No session key'}, status=403)
+    try:
+        before_id = int(request.GET.get('before', '').replace(',', ''))
+    except ValueError:
+        before_id = None
+    messages, has_more = get_history_page(request.user, thread_id, base64.b64decode(aes_key_b64), before_id=before_id)
+    html = render_to_string('main/chat_messages.html', {'messages': messages}, request=request)
+    return JsonResponse({
+        'html': html,
+        'has_more': has_more,
+        'oldest_id': messages[0].id if messages else None,
+    })
@@ -0,0 +1,17 @@
+"""
+Monitoring endpoint - per-process cache and service counters
+"""
+from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required, user_passes_test
+from main.utilities.metrics import collect_stats
+import main.utilities.maintenance  # Registers the vector_db_maintenance stats (last run of the maintenance command)
+
+
+@login_required(login_url='users:login')
+@user_passes_test(lambda user: user.is_superuser or user.groups.filter(name='Admin').exists(), login_url='main:main_chat')
+def metrics_view(request):
+    """
+    Return the counters of this worker process as JSON.
+    With several workers each one reports its own numbers.
+    """
+    return JsonResponse(collect_stats())
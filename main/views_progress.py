@@ -3,6 +3,8 @@ Indexing progress tracking view
 """
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from main.models import IndexingJob, Thread, Collection
+from main.utilities.indexing import job_progress, target_jobs_progress
 
 
 @login_required(login_url='users:login')
@@ -10,17 +12,35 @@ def indexing_progress_view(request):
     """
     Return current indexing progress for AJAX polling
     (AJAX logs suppressed via settings.LOGGING filter)
+    Progress is read from the IndexingJobs, which the background worker updates per file.
+
+    ?thread_id= / ?collection_id=: {"jobs": [...], "active": bool} for that target (polled by the thread and collection pages).
+    No parameter: the user's latest active job (current / total / filename), polled while an upload is being sent.
     """
-    progress = request.session.get('indexing_progress')
-    if not progress:
+    user = request.user
+    thread_id = request.GET.get("thread_id")
+    collection_id = request.GET.get("collection_id")
+    if thread_id or collection_id:
+        jobs = []
+        if thread_id and thread_id.isdigit():
+            thread = Thread.objects.filter(id=int(thread_id), user=user).first()
+            if thread is not None:
+                jobs = target_jobs_progress(thread=thread)
+        elif collection_id and collection_id.isdigit() and (user.is_admin() or user.is_advanced_user() or user.is_superuser):
+            collection = Collection.objects.filter(id=int(collection_id)).first()
+            if collection is not None:
+                jobs = target_jobs_progress(collection=collection)
+        active = any(job['status'] in (IndexingJob.STATUS_PENDING, IndexingJob.STATUS_RUNNING) for job in jobs)
+        return JsonResponse({'jobs': jobs, 'active': active})
+
+    job = (IndexingJob.objects
+           .filter(user=user, status__in=[IndexingJob.STATUS_PENDING, IndexingJob.STATUS_RUNNING])
+           .order_by('-time_created')
+           .first())
+    if job is None:
         return JsonResponse({
             'current': 0,
             'total': 0,
             'filename': ''
         })
-    
-    return JsonResponse({
-        'current': progress.get('current', 0),
-        'total': progress.get('total', 0),
-        'filename': progress.get('filename', '')
-    })
+    return JsonResponse(job_progress(job))